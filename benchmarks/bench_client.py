@@ -0,0 +1,230 @@
+# SPDX-FileCopyrightText: 2024 DaniElectra
+#
+# SPDX-License-Identifier: MIT
+
+"""Measures the hot paths of PouClient: the overhead of pou_request, the
+parsing of 20-item pages, PouMinInfo.from_response, the encoding and
+hashing of saves, and the end-to-end pagination against the local
+stand-in server.
+
+The package has to be importable, so install it first with
+pip install -e . from the root of the repository. The results are written
+as JSON, so the results of two commits can be compared:
+
+	python benchmarks/bench_client.py --output before.json
+	git checkout other-commit
+	python benchmarks/bench_client.py --output after.json --compare before.json
+"""
+
+from pou.online import client, codec, common, pagination, request, server, site, transport, user
+from bench_codec import make_min_info, make_user_list
+
+import argparse
+import asyncio
+import hashlib
+import json
+import platform
+import subprocess
+import time
+import timeit
+
+class StaticTransport:
+	"""Transport that answers every request with the same body without any
+	I/O, so only the work done by the client is measured.
+	"""
+
+	def __init__(self, content: bytes):
+		self.response = transport.Response(200, content)
+
+	async def send(self, method: str, url: str, params: dict = None, data: bytes = None, headers: dict = None):
+		return self.response
+
+	def close(self):
+		pass
+
+def bench(function, number: int):
+	"""Returns the best time of a function over 5 runs, in microseconds."""
+	return min(timeit.repeat(function, number = number, repeat = 5)) / number * 1e6
+
+def bench_async(coroutine_function, number: int):
+	"""Returns the best time of a coroutine function over 5 runs, in
+	microseconds, awaiting it sequentially on a single event loop.
+	"""
+	async def run():
+		best = None
+		for i in range(5):
+			start = time.perf_counter()
+			for j in range(number):
+				await coroutine_function()
+
+			elapsed = time.perf_counter() - start
+			best = elapsed if best is None else min(best, elapsed)
+
+		return best / number * 1e6
+
+	return asyncio.run(run())
+
+def bench_request(results: dict):
+	# A minimal body, so that decoding and parsing the response barely count
+	pou_client = client.PouClient()
+	pou_client.transport = StaticTransport(b'{"ok":true}')
+	params = {"id": 1, "s": 0}
+
+	results["pou_request GET"] = bench_async(lambda: request.pou_request(pou_client, "/ajax/user/likers", "GET", params), 5000)
+	results["pou_request POST"] = bench_async(lambda: request.pou_request(pou_client, "/ajax/account/check_password", "POST", params), 5000)
+
+	pou_client.single_flight = None
+	pou_client.retry_policy = None
+	results["pou_request GET, no coalescing or retries"] = bench_async(
+		lambda: request.pou_request(pou_client, "/ajax/user/likers", "GET", params), 5000
+	)
+
+	# The whole endpoint, including decoding and parsing a 20-item page
+	pou_client.transport = StaticTransport(codec.dumps_bytes(make_user_list()))
+	results["likers() with a 20-item page"] = bench_async(lambda: pou_client.likers(1), 2000)
+
+	pou_client.session.close()
+
+def bench_parsing(results: dict):
+	response = codec.loads(codec.dumps_bytes(make_user_list()))
+	visitors_response = dict(response)
+	del visitors_response["count"]
+
+	scores_response = codec.loads(codec.dumps_bytes(make_user_list()))
+	for i, item in enumerate(scores_response["items"]):
+		item["s"] = 100000 - i
+
+	results["UserList 20-item page"] = bench(lambda: user.UserList.from_response(response), 5000)
+	results["UserVisitors 20-item page"] = bench(lambda: user.UserVisitors.from_response(visitors_response), 5000)
+	results["UserScoreInfo 20-item page"] = bench(
+		lambda: [site.UserScoreInfo.from_response(item) for item in scores_response["items"]], 5000
+	)
+
+	def parse_with_min_info():
+		for user_info in user.UserList.from_response(response).items:
+			user_info.min_info
+
+	results["UserList 20-item page, min info accessed"] = bench(parse_with_min_info, 2000)
+
+	min_info = make_min_info(7)
+	results["PouMinInfo.from_response"] = bench(lambda: common.PouMinInfo.from_response(min_info), 50000)
+
+def bench_save(results: dict):
+	for kilobytes in (16, 128, 512):
+		state = server.make_save_state(kilobytes)
+		min_info = make_min_info(0)
+
+		def encode_and_hash():
+			body = client.PouClient.encode_save(state, min_info)
+			confirmation = hashlib.md5(b"p@v_")
+			confirmation.update(body)
+			confirmation.update(b"0123456789abcdef0123456789abcdef")
+			return confirmation.hexdigest()
+
+		results["save encode + hash %d KB" % kilobytes] = bench(encode_and_hash, 20)
+
+def bench_pagination(results: dict):
+	pou_server = server.PouServer(server.SyntheticDataset(user_count = 100000, max_list_size = 2000))
+	pou_server.backend.latency = 0.005
+	pou_server.start()
+
+	dataset = pou_server.backend.dataset
+	account_id = max(range(1, 200), key = lambda account_id: dataset.list_size(account_id, "likers"))
+
+	# The consumer spends 20 ms on every fourth page and nothing on the
+	# others, so a deeper prefetch can absorb the slow pages
+	async def consume(page_number: int):
+		if page_number % 4 == 0:
+			await asyncio.sleep(0.02)
+
+	async def paginate(prefetch: int):
+		pou_client = client.PouClient()
+		pou_client.host = pou_server.host
+
+		start = time.perf_counter()
+		count = 0
+		if prefetch:
+			pages = pagination.iter_pages(pou_client.likers, account_id, prefetch = prefetch)
+			async for page in pages:
+				await consume(count // 20)
+				count += len(page.items)
+		else:
+			since = 0
+			while True:
+				page = await pou_client.likers(account_id, since)
+				await consume(count // 20)
+				count += len(page.items)
+				if not page.next or not page.items:
+					break
+
+				since = page.next
+
+		elapsed = time.perf_counter() - start
+		pou_client.close()
+		return count / elapsed
+
+	try:
+		for prefetch in (0, 1, 4):
+			# Users per second, the higher the better
+			name = "pagination users/s, prefetch %d" % prefetch if prefetch else "pagination users/s, sequential"
+			results[name] = max(asyncio.run(paginate(prefetch)) for i in range(3))
+	finally:
+		pou_server.shutdown()
+
+def git_commit():
+	try:
+		return subprocess.run(
+			["git", "rev-parse", "--short", "HEAD"], capture_output = True, text = True, check = True
+		).stdout.strip()
+	except (OSError, subprocess.CalledProcessError):
+		return None
+
+def compare(results: dict, baseline: dict):
+	print("%-48s %12s %12s %8s" % ("case", "baseline", "current", "change"))
+	for name, value in results.items():
+		if name not in baseline:
+			continue
+
+		change = (value - baseline[name]) / baseline[name] * 100
+		print("%-48s %12.1f %12.1f %+7.1f%%" % (name, baseline[name], value, change))
+
+def main():
+	parser = argparse.ArgumentParser(description = "Benchmarks the hot paths of PouClient")
+	parser.add_argument("--output", help = "file where the results are written as JSON")
+	parser.add_argument("--compare", help = "results of a previous run to compare against")
+	parser.add_argument("--skip-network", action = "store_true", help = "skip the loopback pagination benchmark")
+	args = parser.parse_args()
+
+	# Every case is in microseconds per operation, except the pagination
+	# throughput, in users per second
+	results = {}
+	bench_request(results)
+	bench_parsing(results)
+	bench_save(results)
+	if not args.skip_network:
+		bench_pagination(results)
+
+	print("%-48s %12s" % ("case", "result"))
+	for name, value in results.items():
+		print("%-48s %12.1f" % (name, value))
+
+	if args.output:
+		report = {
+			"commit": git_commit(),
+			"timestamp": int(time.time()),
+			"python": platform.python_version(),
+			"codec": codec.backend,
+			"results": results
+		}
+		with open(args.output, "w") as f:
+			json.dump(report, f, indent = 2)
+
+	if args.compare:
+		with open(args.compare, "r") as f:
+			baseline = json.load(f)["results"]
+
+		print()
+		compare(results, baseline)
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,67 @@
+# SPDX-FileCopyrightText: 2024 DaniElectra
+#
+# SPDX-License-Identifier: MIT
+
+"""Compares the JSON backends of pou.online.codec on the payloads that go
+through them on every request: 20-item user lists and save states of
+several sizes.
+
+Usage: python benchmarks/bench_codec.py, after installing the package with
+pip install -e . from the root of the repository
+"""
+
+from pou.online import codec, user
+from pou.online.server import make_save_state
+
+import timeit
+
+def make_min_info(seed: int):
+	return {"sz": 1.0 + seed % 3 / 10, "ob": 0.5, "bCo": seed % 40, "eCo": seed % 12, "hat": seed % 90, "sho": seed % 25}
+
+def make_user_list(size: int = 20):
+	items = []
+	for i in range(size):
+		items.append({
+			"i": str(1000000 + i),
+			"n": "user%d" % i,
+			"minI": codec.dumps(make_min_info(i)),
+			"l": "1",
+			"nL": str(i * 7),
+			"iL": 0,
+			"lM": 1
+		})
+
+	return {"ok": True, "items": items, "count": "5000", "next": "1700000000"}
+
+def bench(function, number: int):
+	return min(timeit.repeat(function, number = number, repeat = 5)) / number * 1e6
+
+def run():
+	page = codec.dumps_bytes(make_user_list())
+	states = {kilobytes: make_save_state(kilobytes) for kilobytes in (16, 128, 512)}
+
+	print("%-8s %-32s %12s" % ("backend", "case", "us/op"))
+	for name in codec.available_backends():
+		codec.use_backend(name)
+
+		result = bench(lambda: user.UserList.from_response(codec.loads(page)), 2000)
+		print("%-8s %-32s %12.1f" % (name, "decode + parse 20-item list", result))
+
+		min_infos = [item.min_info_raw for item in user.UserList.from_response(codec.loads(page)).items]
+		result = bench(lambda: [codec.loads(min_info) for min_info in min_infos], 2000)
+		print("%-8s %-32s %12.1f" % (name, "decode 20 minI", result))
+
+		for kilobytes, state in states.items():
+			def encode():
+				payload = {"minInfo": codec.dumps(make_min_info(0)), "state": codec.dumps(state)}
+				return codec.dumps_bytes(payload)
+
+			result = bench(encode, 20)
+			print("%-8s %-32s %12.1f" % (name, "encode %d KB save" % kilobytes, result))
+
+			body = codec.dumps(state)
+			result = bench(lambda: codec.loads(body), 20)
+			print("%-8s %-32s %12.1f" % (name, "decode %d KB state" % kilobytes, result))
+
+if __name__ == "__main__":
+	run()
@@ -19,6 +19,11 @@ class AccountInfo:
 	likers_count -- the number of likers the account has
 	"""
 
+	__slots__ = (
+		"account_id", "email", "has_password", "nickname", "t", "l",
+		"favorites_count", "likers_count"
+	)
+
 	def __init__(self):
 		self.account_id = 0
 		self.email = ""
@@ -44,3 +49,7 @@ class AccountInfo:
 		account_info.likers_count = int(response["nL"])
 
 		return account_info
+
+	def to_dict(self):
+		"""Returns the attributes of this class as a dict."""
+		return {attribute: getattr(self, attribute) for attribute in AccountInfo.__slots__}
@@ -0,0 +1,207 @@
+# SPDX-FileCopyrightText: 2024 DaniElectra
+#
+# SPDX-License-Identifier: MIT
+
+from pou.online import codec, common
+
+import array
+import operator
+
+_operators = {
+	"<": operator.lt,
+	"<=": operator.le,
+	"==": operator.eq,
+	"!=": operator.ne,
+	">=": operator.ge,
+	">": operator.gt
+}
+
+class UserBatch:
+	"""Columnar container for the users of many user list pages. The pages
+	are decoded straight into typed arrays instead of one UserInfo and one
+	PouMinInfo per user.
+
+	The numeric columns are array.array objects, and the i_like and
+	likes_me columns are bitmaps with one bit per user. Every attribute of
+	PouMinInfo has a column with the same name.
+
+	Attributes:
+	account_ids -- the account IDs of the users
+	nicknames -- the nicknames of the users
+	l -- unknown argument of the users
+	likers_count -- the number of likers of the users
+	i_like -- bitmap telling if the account of the client likes the users
+	likes_me -- bitmap telling if the users like the client's account
+	min_info -- the PouMinInfo columns, by attribute name
+	next -- the "next" argument of the last page added
+	"""
+
+	# Columns of the PouMinInfo attributes that hold floats
+	float_columns = ("size", "obesity")
+
+	def __init__(self):
+		self.account_ids = array.array("q")
+		self.nicknames = []
+		self.l = array.array("q")
+		self.likers_count = array.array("q")
+		self.i_like = bytearray()
+		self.likes_me = bytearray()
+		self.min_info = {}
+		for attribute in common.PouMinInfo.fields.values():
+			self.min_info[attribute] = array.array("d" if attribute in self.float_columns else "q")
+
+		self.next = 0
+
+	def __len__(self):
+		return len(self.account_ids)
+
+	@staticmethod
+	def from_response(response: dict):
+		"""Creates a batch from the server response of a user list."""
+		batch = UserBatch()
+		batch.extend(response)
+		return batch
+
+	def extend(self, response: dict):
+		"""Appends the users of the server response of a user list, and keeps
+		its "next" argument.
+		"""
+		fields = common.PouMinInfo.fields
+		min_info = self.min_info
+
+		for item in response["items"]:
+			index = len(self.account_ids)
+			if index % 8 == 0:
+				self.i_like.append(0)
+				self.likes_me.append(0)
+
+			self.account_ids.append(int(item["i"]))
+			self.nicknames.append(item["n"])
+			self.l.append(int(item["l"]))
+			self.likers_count.append(int(item["nL"]))
+
+			if item.get("iL"):
+				self.i_like[index >> 3] |= 1 << (index & 7)
+
+			if item.get("lM"):
+				self.likes_me[index >> 3] |= 1 << (index & 7)
+
+			values = codec.loads(item["minI"]) if item["minI"] else {}
+			for key, attribute in fields.items():
+				min_info[attribute].append(values.get(key, 0))
+
+		self.next = int(response.get("next", 0))
+
+	def column(self, name: str):
+		"""Returns the column with the given name. Bitmaps are returned as a
+		list of bools. Raises KeyError if there is no such column.
+		"""
+		if name in ("i_like", "likes_me"):
+			bitmap = getattr(self, name)
+			return [bool(bitmap[i >> 3] & (1 << (i & 7))) for i in range(len(self))]
+
+		if name in self.min_info:
+			return self.min_info[name]
+
+		if name in ("account_id", "account_ids"):
+			return self.account_ids
+
+		if name in ("nicknames", "l", "likers_count"):
+			return getattr(self, name)
+
+		raise KeyError(name)
+
+	def to_numpy(self):
+		"""Exports the batch to a dict of NumPy arrays, by column name. The
+		numeric columns share the memory of the batch, so the batch can't be
+		extended while they are alive. The bitmaps are unpacked into new bool
+		arrays. Requires NumPy.
+		"""
+		import numpy
+
+		size = len(self)
+		columns = {
+			"account_id": numpy.frombuffer(self.account_ids, dtype = numpy.int64),
+			"l": numpy.frombuffer(self.l, dtype = numpy.int64),
+			"likers_count": numpy.frombuffer(self.likers_count, dtype = numpy.int64)
+		}
+
+		for name in ("i_like", "likes_me"):
+			bitmap = numpy.frombuffer(getattr(self, name), dtype = numpy.uint8)
+			columns[name] = numpy.unpackbits(bitmap, count = size, bitorder = "little").astype(bool)
+
+		for attribute, values in self.min_info.items():
+			dtype = numpy.float64 if values.typecode == "d" else numpy.int64
+			columns[attribute] = numpy.frombuffer(values, dtype = dtype)
+
+		return columns
+
+	def where(self, name: str, op: str, value):
+		"""Returns a new batch with the users whose column compares true with a
+		value, e.g. batch.where("likers_count", ">", 100). The comparison and
+		the copy of the rows are vectorized with NumPy when it's installed.
+		"""
+		compare = _operators[op]
+
+		try:
+			import numpy
+		except ImportError:
+			numpy = None
+
+		if numpy is not None:
+			if name == "nicknames":
+				column = numpy.array(self.nicknames, dtype = object)
+			else:
+				column = self.to_numpy().get("account_id" if name == "account_ids" else name)
+				if column is None:
+					raise KeyError(name)
+
+			return self.select(numpy.flatnonzero(compare(column, value)))
+
+		column = self.column(name)
+		return self.select([i for i in range(len(self)) if compare(column[i], value)])
+
+	def select(self, indices):
+		"""Returns a new batch with the users at the given positions, as a list
+		or a NumPy integer array. Each column is copied at once, with NumPy
+		when it's installed.
+		"""
+		try:
+			import numpy
+		except ImportError:
+			numpy = None
+
+		batch = UserBatch()
+		batch.next = self.next
+
+		columns = [(self.account_ids, batch.account_ids), (self.l, batch.l), (self.likers_count, batch.likers_count)]
+		for attribute, values in self.min_info.items():
+			columns.append((values, batch.min_info[attribute]))
+
+		if numpy is not None:
+			indices = numpy.asarray(indices, dtype = numpy.intp)
+			for values, selected in columns:
+				dtype = numpy.float64 if values.typecode == "d" else numpy.int64
+				selected.frombytes(numpy.frombuffer(values, dtype = dtype)[indices].tobytes())
+
+			for name in ("i_like", "likes_me"):
+				bits = numpy.unpackbits(numpy.frombuffer(getattr(self, name), dtype = numpy.uint8), count = len(self), bitorder = "little")
+				setattr(batch, name, bytearray(numpy.packbits(bits[indices], bitorder = "little").tobytes()))
+
+			indices = indices.tolist()
+		else:
+			indices = list(indices)
+			for values, selected in columns:
+				selected.extend(map(values.__getitem__, indices))
+
+			for name in ("i_like", "likes_me"):
+				bitmap = getattr(self, name)
+				selected = bytearray((len(indices) + 7) // 8)
+				for index, i in enumerate(indices):
+					if bitmap[i >> 3] & (1 << (i & 7)):
+						selected[index >> 3] |= 1 << (index & 7)
+
+				setattr(batch, name, selected)
+
+		batch.nicknames = list(map(self.nicknames.__getitem__, indices))
+		return batch
@@ -0,0 +1,100 @@
+# SPDX-FileCopyrightText: 2024 DaniElectra
+#
+# SPDX-License-Identifier: MIT
+
+import collections
+import time
+
+def request_key(path: str, params: dict):
+	"""Returns a hashable key identifying a request by its path and its
+	parameters, regardless of their order.
+	"""
+	if not params:
+		return (path, ())
+
+	return (path, tuple(sorted((key, str(value)) for key, value in params.items())))
+
+class ResponseCache:
+	"""In-process cache of the server responses to read-only requests.
+
+	Responses are keyed by their path and their parameters, and expire after
+	the TTL configured for their path. Paths without a TTL are never cached.
+	When the cache holds max_size responses, the least recently used one is
+	evicted.
+
+	The cached responses are shared by every caller, so they must not be
+	modified.
+
+	Attributes:
+	max_size -- the maximum number of responses held by the cache
+	ttls -- the number of seconds a response is kept for each path
+	hits -- the number of requests answered from the cache
+	misses -- the number of cacheable requests sent to the server
+	"""
+
+	default_ttls = {
+		"/ajax/site/top_likes": 60,
+		"/ajax/site/top_scores": 60,
+		"/ajax/account/info": 30,
+		"/ajax/user/favorites": 30,
+		"/ajax/user/likers": 30,
+		"/ajax/user/visitors": 30
+	}
+
+	def __init__(self, max_size: int = 1024, ttls: dict = None):
+		self.max_size = max_size
+		self.ttls = dict(self.default_ttls if ttls is None else ttls)
+		self.hits = 0
+		self.misses = 0
+		self.entries = collections.OrderedDict()
+
+	def __len__(self):
+		return len(self.entries)
+
+	def get(self, path: str, params: dict = None):
+		"""Returns the cached response of a request, or None if it isn't
+		cached or has expired.
+		"""
+		if path not in self.ttls:
+			return None
+
+		key = request_key(path, params)
+		entry = self.entries.get(key)
+		if entry is not None:
+			expires, response = entry
+			if expires > time.monotonic():
+				self.entries.move_to_end(key)
+				self.hits += 1
+				return response
+
+			del self.entries[key]
+
+		self.misses += 1
+		return None
+
+	def put(self, path: str, params: dict, response: dict):
+		"""Stores the response of a request if its path is cacheable."""
+		ttl = self.ttls.get(path)
+		if ttl is None:
+			return
+
+		key = request_key(path, params)
+		self.entries[key] = (time.monotonic() + ttl, response)
+		self.entries.move_to_end(key)
+
+		while len(self.entries) > self.max_size:
+			self.entries.popitem(last = False)
+
+	def invalidate(self, prefix: str):
+		"""Removes every cached response whose path starts with prefix."""
+		for key in [key for key in self.entries if key[0].startswith(prefix)]:
+			del self.entries[key]
+
+	def clear(self):
+		"""Removes every cached response."""
+		self.entries.clear()
+
+	def hit_rate(self):
+		"""Returns the fraction of cacheable requests answered from the cache."""
+		total = self.hits + self.misses
+		return self.hits / total if total else 0.0
@@ -0,0 +1,229 @@
+# SPDX-FileCopyrightText: 2024 DaniElectra
+#
+# SPDX-License-Identifier: MIT
+
+from pou.online import export, transport
+
+import asyncio
+import base64
+import collections
+import http.cookies
+import time
+import urllib.parse
+
+# The parameters added by the client to every request
+client_params = ("_a", "_c", "_v", "_r")
+
+class CassetteMiss(Exception):
+	"""Raised by a ReplayTransport when no recorded request matches."""
+
+def _encode_bytes(data: bytes):
+	if data is None:
+		return None, False
+
+	try:
+		return data.decode("utf-8"), False
+	except UnicodeDecodeError:
+		return base64.b64encode(data).decode("ascii"), True
+
+def _decode_bytes(data: str, binary: bool):
+	if data is None:
+		return None
+
+	if binary:
+		return base64.b64decode(data)
+
+	return data.encode("utf-8")
+
+def request_key(method: str, path: str, params: dict, ignore_params: tuple = ()):
+	"""Returns the key that identifies a request on a cassette. The values of
+	the parameters are compared as strings, in any order.
+	"""
+	items = ()
+	if params:
+		items = tuple(sorted((str(key), str(value)) for key, value in params.items() if key not in ignore_params))
+
+	return method.upper(), path, items
+
+class Interaction:
+	"""Holds a request and its response, as stored on a cassette.
+
+	Attributes:
+	method -- the HTTP method of the request
+	path -- the URL path of the request
+	params -- the query parameters of the request
+	body -- the body of the request, or None
+	status -- the HTTP status code of the response
+	headers -- the response headers
+	content -- the response body
+	offset -- the seconds since the recording started when the request was
+	sent
+	elapsed -- the seconds the response took
+	"""
+	__slots__ = ("method", "path", "params", "body", "status", "headers", "content", "offset", "elapsed")
+
+	def __init__(self):
+		self.method = "GET"
+		self.path = ""
+		self.params = {}
+		self.body = None
+		self.status = 200
+		self.headers = {}
+		self.content = b""
+		self.offset = 0.0
+		self.elapsed = 0.0
+
+	@staticmethod
+	def from_dict(record: dict):
+		"""Fills the attributes of this class from a cassette record."""
+		interaction = Interaction()
+		interaction.method = record["m"]
+		interaction.path = record["p"]
+		interaction.params = record.get("q") or {}
+		interaction.body = _decode_bytes(record.get("b"), record.get("bb", False))
+		interaction.status = record["s"]
+		interaction.headers = record.get("h") or {}
+		interaction.content = _decode_bytes(record["c"], record.get("cb", False))
+		interaction.offset = record.get("o", 0.0)
+		interaction.elapsed = record.get("e", 0.0)
+		return interaction
+
+	def to_dict(self):
+		"""Returns the interaction as a cassette record, with short keys."""
+		record = {"m": self.method, "p": self.path, "s": self.status}
+		if self.params:
+			record["q"] = {key: str(value) for key, value in self.params.items()}
+
+		if self.body is not None:
+			record["b"], binary = _encode_bytes(self.body)
+			if binary:
+				record["bb"] = True
+
+		if self.headers:
+			record["h"] = self.headers
+
+		record["c"], binary = _encode_bytes(self.content)
+		if binary:
+			record["cb"] = True
+
+		record["o"] = round(self.offset, 6)
+		record["e"] = round(self.elapsed, 6)
+		return record
+
+def read_cassette(path: str):
+	"""Returns the Interaction list of a cassette, in the order they were
+	recorded.
+	"""
+	return [Interaction.from_dict(record) for record in export.read_ndjson(path, compress = True)]
+
+class RecordingTransport:
+	"""Transport that sends the requests through another transport and
+	writes every request and its response to a cassette: a gzip compressed
+	file with one JSON record per line.
+
+	Attributes:
+	transport -- the transport that sends the requests
+	path -- the path of the cassette
+	writer -- the NDJSONWriter of the cassette
+	"""
+	def __init__(self, inner, path: str):
+		self.transport = inner
+		self.path = path
+		self.writer = export.NDJSONWriter(path, compress = True, batch_size = 100)
+		self.start = time.monotonic()
+
+	async def send(self, method: str, url: str, params: dict = None, data: bytes = None, headers: dict = None):
+		"""Sends a request through the inner transport and records it."""
+		start = time.monotonic()
+		response = await self.transport.send(method, url, params, data, headers)
+
+		interaction = Interaction()
+		interaction.method = method
+		interaction.path = urllib.parse.urlsplit(url).path
+		interaction.params = params or {}
+		interaction.body = data
+		interaction.status = response.status
+		interaction.headers = response.headers
+		interaction.content = response.content
+		interaction.offset = start - self.start
+		interaction.elapsed = time.monotonic() - start
+		self.writer.write(interaction.to_dict())
+
+		return response
+
+	def close(self):
+		"""Writes the rest of the cassette and closes the inner transport."""
+		self.writer.close()
+		self.transport.close()
+
+class ReplayTransport:
+	"""Transport that answers the requests with the responses recorded on a
+	cassette, without any network access.
+
+	Requests are matched by method, path and parameters. Identical requests
+	get their recorded responses in order, and the last one is repeated once
+	they run out. The cookies set by the responses, like "unn_session", are
+	applied to the session of the client, so the save and delete
+	confirmations are computed as they were when recording.
+
+	Attributes:
+	path -- the path of the cassette
+	session -- the requests.Session that receives the cookies, or None
+	ignore_params -- the parameters ignored when matching requests, by
+	default the ones that only depend on the client version
+	timing -- if the original pacing is reproduced: each response is
+	delivered no earlier than it was during the recording, counting from the
+	first request, and never takes less time than it originally took
+	interactions -- the recorded interactions of each request key
+	"""
+	def __init__(self, path: str, session = None, ignore_params: tuple = client_params, timing: bool = False):
+		self.path = path
+		self.session = session
+		self.ignore_params = ignore_params
+		self.timing = timing
+		self.start = None
+
+		self.interactions = collections.defaultdict(collections.deque)
+		for interaction in read_cassette(path):
+			key = request_key(interaction.method, interaction.path, interaction.params, ignore_params)
+			self.interactions[key].append(interaction)
+
+	async def send(self, method: str, url: str, params: dict = None, data: bytes = None, headers: dict = None):
+		"""Returns the recorded Response of a request. Raises CassetteMiss if
+		the request wasn't recorded.
+		"""
+		path = urllib.parse.urlsplit(url).path
+		queue = self.interactions.get(request_key(method, path, params, self.ignore_params))
+		if not queue:
+			raise CassetteMiss("%s %s was not recorded on %s" % (method, path, self.path))
+
+		interaction = queue.popleft() if len(queue) > 1 else queue[0]
+
+		if self.timing:
+			now = time.monotonic()
+			if self.start is None:
+				self.start = now - interaction.offset
+
+			delay = max(interaction.elapsed, self.start + interaction.offset + interaction.elapsed - now)
+			if delay > 0:
+				await asyncio.sleep(delay)
+
+		if self.session is not None:
+			self._set_cookies(interaction.headers)
+
+		return transport.Response(interaction.status, interaction.content, dict(interaction.headers))
+
+	def _set_cookies(self, headers: dict):
+		for name, value in headers.items():
+			if name.lower() != "set-cookie":
+				continue
+
+			cookies = http.cookies.SimpleCookie()
+			cookies.load(value)
+			for cookie in cookies.values():
+				self.session.cookies.set(cookie.key, cookie.value)
+
+	def close(self):
+		"""Closes the session, if any."""
+		if self.session is not None:
+			self.session.close()
@@ -2,9 +2,9 @@
 #
 # SPDX-License-Identifier: MIT
 
-from pou.online import account, request, site, user
+from pou.online import account, batch, cache, cassette, codec, coalesce, common, metrics, pagination, ratelimit, request, retry, saving, site, transport, user
 
-import hashlib, json
+import hashlib
 import requests
 
 class PouClient:
@@ -17,6 +17,25 @@ class PouClient:
 	revision -- the client revision
 	host -- the server host
 	session -- the session for handling the requests
+	transport -- the transport used to send the requests without blocking
+	the event loop
+	rate_limiter -- the RateLimiter shared by all the requests of the
+	client, or None to disable it
+	cache -- the ResponseCache for read-only requests, or None to disable
+	it
+	single_flight -- the SingleFlight that coalesces identical GET
+	requests in flight, or None to disable it
+	retry_policy -- the RetryPolicy for GET requests that fail for
+	transient reasons, or None to disable retries
+	keep_min_info -- if the information about the Pou of the users returned
+	by the server is kept, to be decoded on first access
+	min_info_interner -- the MinInfoInterner shared by the users parsed by
+	the client, or None to disable interning
+	save_manager -- the SaveManager that debounces the saves, or None
+	metrics -- the Metrics of the requests of the client, or None to
+	disable them
+	request_hooks -- the functions called before each request is sent
+	response_hooks -- the functions called after each request is done
 	"""
 	def __init__(self):
 		self.api = 1
@@ -28,6 +47,18 @@ class PouClient:
 
 		self.session.cookies.set("unn_session", None)
 
+		self.transport = transport.RequestsTransport(self.session)
+		self.rate_limiter = None
+		self.cache = None
+		self.single_flight = coalesce.SingleFlight()
+		self.retry_policy = retry.RetryPolicy()
+		self.keep_min_info = True
+		self.min_info_interner = None
+		self.save_manager = None
+		self.metrics = None
+		self.request_hooks = []
+		self.response_hooks = []
+
 	@staticmethod
 	def from_version(api: int, c: int, version: int, revision: int):
 		"""Creates a new PouClient using the provided client version and the
@@ -41,6 +72,81 @@ class PouClient:
 
 		return client
 
+	def close(self):
+		"""Closes the connections used by the client."""
+		self.transport.close()
+
+	def enable_rate_limiter(self, rates: dict = None, min_rate: float = 0.05, recovery: float = 0.01):
+		"""Enables limiting the rate of the requests sent to the server. The
+		rates map each endpoint path prefix to a (requests per second, burst)
+		tuple. Returns the RateLimiter.
+		"""
+		self.rate_limiter = ratelimit.RateLimiter(rates, min_rate, recovery)
+		return self.rate_limiter
+
+	def enable_cache(self, max_size: int = 1024, ttls: dict = None):
+		"""Enables caching the responses of read-only requests. The TTLs map each
+		endpoint path to the number of seconds its responses are kept.
+		"""
+		self.cache = cache.ResponseCache(max_size, ttls)
+
+	def enable_metrics(self):
+		"""Enables collecting metrics about the requests of the client. Returns
+		the Metrics.
+		"""
+		self.metrics = metrics.Metrics()
+		return self.metrics
+
+	def enable_recording(self, path: str):
+		"""Enables writing every request and its response to a cassette at the
+		given path, which is completed when the client is closed.
+		"""
+		self.transport = cassette.RecordingTransport(self.transport, path)
+
+	def enable_replay(self, path: str, ignore_params: tuple = cassette.client_params, timing: bool = False):
+		"""Replaces the network with the responses recorded on a cassette. If
+		timing is True, each response takes as long as it did originally.
+		"""
+		self.transport.close()
+		self.transport = cassette.ReplayTransport(path, self.session, ignore_params, timing)
+
+	def enable_interning(self, max_size: int = 65536):
+		"""Enables interning the information about the Pou of the users parsed
+		by the client, so that users with the same Pou aspect share a single
+		undecoded string and a single FrozenPouMinInfo. Each aspect is decoded
+		once, when it's first seen. Returns the MinInfoInterner.
+		"""
+		self.min_info_interner = common.MinInfoInterner(max_size)
+		return self.min_info_interner
+
+	def add_hook(self, event: str, hook):
+		"""Registers a function called with a RequestEvent on every "request"
+		(before it's sent) or "response" (once it's done, even if it fails).
+		The function can be a regular function or a coroutine function.
+		"""
+		if event == "request":
+			self.request_hooks.append(hook)
+		elif event == "response":
+			self.response_hooks.append(hook)
+		else:
+			raise ValueError("Unknown hook event: %s" % event)
+
+	def remove_hook(self, event: str, hook):
+		"""Unregisters a function registered with add_hook."""
+		if event == "request":
+			self.request_hooks.remove(hook)
+		elif event == "response":
+			self.response_hooks.remove(hook)
+		else:
+			raise ValueError("Unknown hook event: %s" % event)
+
+	def enable_save_manager(self, debounce: float = 5.0):
+		"""Enables debouncing the saves requested through request_save. Returns
+		the SaveManager.
+		"""
+		self.save_manager = saving.SaveManager(self, debounce)
+		return self.save_manager
+
 # ---------------------
 # --- Site endpoint ---
 # ---------------------
@@ -51,7 +157,7 @@ class PouClient:
 		None if it is.
 		"""
 		params = { "e": email }
-		response = request.pou_request(self, "/ajax/site/check_email", "POST", params)
+		response = await request.pou_request(self, "/ajax/site/check_email", "POST", params)
 
 		if not response["registered"]:
 			captcha = site.Captcha.from_response(response)
@@ -62,13 +168,13 @@ class PouClient:
 		array showing the information of each user.
 		"""
 
-		response = request.pou_request(self, "/ajax/site/top_likes", "GET")
+		response = await request.pou_request(self, "/ajax/site/top_likes", "GET")
 
 		if response["ok"]:
 			user_list = []
 
 			for pou_user in response["items"]:
-				user_info = user.UserInfo.from_response(pou_user)
+				user_info = user.UserInfo.from_response(pou_user, self.keep_min_info, self.min_info_interner)
 				user_list.append(user_info)
 
 			return user_list
@@ -83,7 +189,7 @@ class PouClient:
 		"""
 
 		params = { "e": email, "cI": captcha_id, "cA": captcha_answer }
-		response = request.pou_request(self, "/ajax/site/register", "POST", params)
+		response = await request.pou_request(self, "/ajax/site/register", "POST", params)
 
 		if "error" in response:
 			if response["error"]["type"] == "ICap":
@@ -105,13 +211,13 @@ class PouClient:
 		"""
 
 		params = { "g": game_id, "d": period }
-		response = request.pou_request(self, "/ajax/site/top_scores", "GET")
+		response = await request.pou_request(self, "/ajax/site/top_scores", "GET", params)
 
 		if response["ok"]:
 			user_list = []
 
 			for pou_user in response["items"]:
-				user_info = site.UserScoreInfo.from_response(pou_user)
+				user_info = site.UserScoreInfo.from_response(pou_user, self.keep_min_info, self.min_info_interner)
 				user_list.append(user_info)
 
 			return user_list
@@ -126,7 +232,11 @@ class PouClient:
 		p = hashlib.md5(password.encode("utf-8")).hexdigest()
 
 		params = {"e": email, "p": p}
-		response = request.pou_request(self, "/ajax/site/login", "POST", params)
+		response = await request.pou_request(self, "/ajax/site/login", "POST", params)
+
+		# Responses of the previous session may depend on its account
+		if self.cache is not None:
+			self.cache.clear()
 
 		if response["success"]:
 			user_login = site.UserLogin.from_response(response)
@@ -136,32 +246,68 @@ class PouClient:
 # --- Account endpoint ---
 # ------------------------
 
+	@staticmethod
+	def encode_save(save_state: dict, min_info: dict):
+		"""Encodes the game state and the min info into the body of a save
+		request. Returns the body as bytes.
+		"""
+		payload = {"minInfo": codec.dumps(min_info), "state": codec.dumps(save_state)}
+		return codec.dumps_bytes(payload)
+
 	async def save(self, save_state: dict, min_info: dict):
 		"""Saves the Pou, game state and online scores to the server. Returns a
 		bool telling if the save succeeds.
 		"""
+		return await self.save_body(self.encode_save(save_state, min_info))
 
-		payload = {"minInfo": json.dumps(min_info), "state": json.dumps(save_state)}
+	async def save_body(self, body: bytes):
+		"""Uploads a save request body made by encode_save. Returns a bool
+		telling if the save succeeds.
 
-		str_payload = json.dumps(payload)
+		The body is sent exactly as it's hashed, so the confirmation always
+		matches the bytes received by the server.
+		"""
 		cookies = self.session.cookies.get_dict()
 		unn_session = cookies["unn_session"]
 
-		# c = MD5("p@v_" + str_payload + unn_session)
-		confirmation = "p@v_" + str_payload + unn_session
-		c = hashlib.md5(confirmation.encode("utf-8")).hexdigest()
+		# c = MD5("p@v_" + body + unn_session)
+		confirmation = hashlib.md5(b"p@v_")
+		confirmation.update(body)
+		confirmation.update(unn_session.encode("utf-8"))
+		c = confirmation.hexdigest()
 
 		params = {"c": c}
-		response = request.pou_request(self, "/ajax/account/save", "POST", params, payload)
+		response = await request.pou_request(self, "/ajax/account/save", "POST", params, body)
+
+		if self.cache is not None:
+			self.cache.invalidate("/ajax/account/")
 
 		return response["success"]
 
+	def request_save(self, save_state: dict, min_info: dict):
+		"""Schedules a save through the save manager, which uploads only the
+		latest state of a burst of saves and skips unchanged states. Requires
+		enable_save_manager.
+		"""
+		if self.save_manager is None:
+			raise RuntimeError("The save manager isn't enabled, call enable_save_manager first")
+
+		self.save_manager.request_save(save_state, min_info)
+
 	async def logout(self):
 		"""Logs off the server if the session is logged in to an account. Returns
 		a bool telling if the logout succeeds.
+
+		If the client has a save manager, the waiting save is uploaded first.
 		"""
+		if self.save_manager is not None:
+			await self.save_manager.flush()
 
-		response = request.pou_request(self, "/ajax/account/logout", "POST")
+		response = await request.pou_request(self, "/ajax/account/logout", "POST")
+
+		# The cached user lists tell the relationship with the account
+		if self.cache is not None:
+			self.cache.clear()
 
 		return response["success"]
 
@@ -170,6 +316,9 @@ class PouClient:
 		relating the account will be deleted. Returns a bool telling if the
 		deletion succeeds.
 		"""
+		if self.save_manager is not None:
+			self.save_manager.discard()
+
 		cookies = self.session.cookies.get_dict()
 		unn_session = cookies["unn_session"]
 
@@ -178,7 +327,10 @@ class PouClient:
 		c = hashlib.md5(confirmation.encode("utf-8")).hexdigest()
 
 		params = {"c": c}
-		response = request.pou_request(self, "/ajax/account/delete", "POST", params)
+		response = await request.pou_request(self, "/ajax/account/delete", "POST", params)
+
+		if self.cache is not None:
+			self.cache.clear()
 
 		return response["success"]
 
@@ -187,7 +339,7 @@ class PouClient:
 		into. Returns an AccountInfo with the account information.
 		"""
 
-		response = request.pou_request(self, "/ajax/account/info", "GET")
+		response = await request.pou_request(self, "/ajax/account/info", "GET")
 
 		if response["ok"]:
 			account_info = account.AccountInfo.from_response(response)
@@ -202,7 +354,7 @@ class PouClient:
 		p = hashlib.md5(password.encode("utf-8")).hexdigest()
 
 		params = {"p": p}
-		response = request.pou_request(self, "/ajax/account/check_password", "POST", params)
+		response = await request.pou_request(self, "/ajax/account/check_password", "POST", params)
 
 		return response["ok"]
 
@@ -217,10 +369,10 @@ class PouClient:
 		"""
 
 		params = { "id": account_id, "s": since }
-		response = request.pou_request(self, "/ajax/user/favorites", "GET", params)
+		response = await request.pou_request(self, "/ajax/user/favorites", "GET", params)
 
 		if response["ok"]:
-			user_list = user.UserList.from_response(response)
+			user_list = user.UserList.from_response(response, self.keep_min_info, self.min_info_interner)
 			return user_list
 
 	async def likers(self, account_id: int, since: int = 0):
@@ -230,10 +382,10 @@ class PouClient:
 		"""
 
 		params = { "id": account_id, "s": since }
-		response = request.pou_request(self, "/ajax/user/likers", "GET", params)
+		response = await request.pou_request(self, "/ajax/user/likers", "GET", params)
 
 		if response["ok"]:
-			user_list = user.UserList.from_response(response)
+			user_list = user.UserList.from_response(response, self.keep_min_info, self.min_info_interner)
 			return user_list
 
 	async def visitors(self, account_id: int, since: int = 0):
@@ -243,8 +395,64 @@ class PouClient:
 		"""
 
 		params = { "id": account_id, "s": since }
-		response = request.pou_request(self, "/ajax/user/visitors", "GET", params)
+		response = await request.pou_request(self, "/ajax/user/visitors", "GET", params)
 
 		if response["ok"]:
-			user_list = user.UserVisitors.from_response(response)
+			user_list = user.UserVisitors.from_response(response, self.keep_min_info, self.min_info_interner)
 			return user_list
+
+	async def favorites_batch(self, account_id: int, since: int = 0, user_batch: batch.UserBatch = None):
+		"""Same as favorites, but decodes the page into a columnar UserBatch. If
+		a batch is given, the users are appended to it. Returns the batch, with
+		the next argument of the page.
+		"""
+		return await self._user_batch("/ajax/user/favorites", account_id, since, user_batch)
+
+	async def likers_batch(self, account_id: int, since: int = 0, user_batch: batch.UserBatch = None):
+		"""Same as likers, but decodes the page into a columnar UserBatch. If a
+		batch is given, the users are appended to it. Returns the batch, with
+		the next argument of the page.
+		"""
+		return await self._user_batch("/ajax/user/likers", account_id, since, user_batch)
+
+	async def visitors_batch(self, account_id: int, since: int = 0, user_batch: batch.UserBatch = None):
+		"""Same as visitors, but decodes the page into a columnar UserBatch. If
+		a batch is given, the users are appended to it. Returns the batch, with
+		the next argument of the page.
+		"""
+		return await self._user_batch("/ajax/user/visitors", account_id, since, user_batch)
+
+	async def _user_batch(self, path: str, account_id: int, since: int, user_batch: batch.UserBatch):
+		params = { "id": account_id, "s": since }
+		response = await request.pou_request(self, path, "GET", params)
+
+		if response["ok"]:
+			if user_batch is None:
+				user_batch = batch.UserBatch()
+
+			user_batch.extend(response)
+			return user_batch
+
+	def iter_favorites(self, account_id: int, since: int = 0, prefetch: int = 1):
+		"""Iterates asynchronously over all the accounts that a user has liked,
+		yielding a UserInfo for each account. The next page is fetched in the
+		background while the current one is consumed, keeping up to prefetch
+		pages ready.
+		"""
+		return pagination.iter_users(self.favorites, account_id, since, prefetch)
+
+	def iter_likers(self, account_id: int, since: int = 0, prefetch: int = 1):
+		"""Iterates asynchronously over all the accounts that have liked a user,
+		yielding a UserInfo for each account. The next page is fetched in the
+		background while the current one is consumed, keeping up to prefetch
+		pages ready.
+		"""
+		return pagination.iter_users(self.likers, account_id, since, prefetch)
+
+	def iter_visitors(self, account_id: int, since: int = 0, prefetch: int = 1):
+		"""Iterates asynchronously over all the accounts that have visited a
+		user, yielding a UserInfo for each account. The next page is fetched in
+		the background while the current one is consumed, keeping up to
+		prefetch pages ready.
+		"""
+		return pagination.iter_users(self.visitors, account_id, since, prefetch)
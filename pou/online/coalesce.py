@@ -0,0 +1,65 @@
+# SPDX-FileCopyrightText: 2024 DaniElectra
+#
+# SPDX-License-Identifier: MIT
+
+import asyncio
+
+class SingleFlight:
+	"""Coalesces identical requests that are in flight at the same time, so
+	that they share a single call and its result.
+
+	The first caller awaits the call itself, and the future that shares its
+	result is only created when another caller joins, so a call nobody else
+	asks for costs almost nothing more than awaiting it directly. If the
+	first caller is cancelled, the ones waiting make the call again instead
+	of being cancelled too.
+
+	Attributes:
+	calls -- the calls currently in flight, by key: the future that the
+	callers who joined wait on, or None if nobody joined yet
+	shared -- the number of callers that joined a call in flight
+	"""
+
+	def __init__(self):
+		self.calls = {}
+		self.shared = 0
+
+	async def do(self, key, function):
+		"""Awaits function() and returns its result. If a call with the same
+		key is already in flight, waits for its result instead.
+		"""
+		while key in self.calls:
+			future = self.calls[key]
+			if future is None:
+				future = self.calls[key] = asyncio.get_running_loop().create_future()
+
+			self.shared += 1
+			try:
+				return await asyncio.shield(future)
+			except asyncio.CancelledError:
+				if not future.cancelled():
+					raise
+
+		self.calls[key] = None
+		try:
+			result = await function()
+		except asyncio.CancelledError:
+			future = self.calls.pop(key)
+			if future is not None:
+				future.cancel()
+
+			raise
+		except BaseException as e:
+			future = self.calls.pop(key)
+			if future is not None:
+				future.set_exception(e)
+				# Only the callers that joined need the exception
+				future.exception()
+
+			raise
+
+		future = self.calls.pop(key)
+		if future is not None:
+			future.set_result(result)
+
+		return result
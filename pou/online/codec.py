@@ -0,0 +1,81 @@
+# SPDX-FileCopyrightText: 2024 DaniElectra
+#
+# SPDX-License-Identifier: MIT
+
+import json
+
+try:
+	import orjson
+except ImportError:
+	orjson = None
+
+try:
+	import ujson
+except ImportError:
+	ujson = None
+
+def _json_backend():
+	def dumps_bytes(obj):
+		return json.dumps(obj).encode("utf-8")
+
+	return json.loads, json.dumps, dumps_bytes
+
+def _orjson_backend():
+	option = orjson.OPT_NON_STR_KEYS
+
+	def dumps(obj):
+		return orjson.dumps(obj, option = option).decode("utf-8")
+
+	def dumps_bytes(obj):
+		return orjson.dumps(obj, option = option)
+
+	return orjson.loads, dumps, dumps_bytes
+
+def _ujson_backend():
+	def dumps(obj):
+		return ujson.dumps(obj, escape_forward_slashes = False)
+
+	def dumps_bytes(obj):
+		return dumps(obj).encode("utf-8")
+
+	return ujson.loads, dumps, dumps_bytes
+
+_backends = {
+	"json": _json_backend,
+	"orjson": _orjson_backend,
+	"ujson": _ujson_backend
+}
+
+def available_backends():
+	"""Returns the names of the JSON backends that can be used, from the
+	fastest to the slowest.
+	"""
+	names = []
+	if orjson is not None:
+		names.append("orjson")
+	if ujson is not None:
+		names.append("ujson")
+
+	names.append("json")
+	return names
+
+def use_backend(name: str):
+	"""Sets the JSON backend used to decode the responses and encode the
+	requests. The backend can be "json", "orjson" or "ujson".
+	"""
+	global backend, loads, dumps, dumps_bytes
+
+	if name not in available_backends():
+		raise ValueError("JSON backend not available: %s" % name)
+
+	loads, dumps, dumps_bytes = _backends[name]()
+	backend = name
+
+# The functions of the current backend: loads decodes str or bytes, dumps
+# encodes to str and dumps_bytes encodes to UTF-8 bytes
+backend = None
+loads = None
+dumps = None
+dumps_bytes = None
+
+use_backend(available_backends()[0])
@@ -2,6 +2,10 @@
 #
 # SPDX-License-Identifier: MIT
 
+from pou.online import codec
+
+import collections
+
 class PouMinInfo:
 	"""Holds information about the aspect of the Pou of a user.
 
@@ -26,6 +30,36 @@ class PouMinInfo:
 	sticker -- numeric value of the sticker
 	shoes -- numeric value of the shoes
 	"""
+	__slots__ = (
+		"size", "obesity", "mustache", "lipstick", "body_color", "outfit",
+		"neck_accesory", "eyes_color", "eyelash", "eyeliner",
+		"eyes_shadow_color", "eyeglasses", "mask", "beard", "wig",
+		"headband", "hat", "sticker", "shoes"
+	)
+
+	# Maps the keys of the server response to the attributes of this class
+	fields = {
+		"sz": "size",
+		"ob": "obesity",
+		"mus": "mustache",
+		"lip": "lipstick",
+		"bCo": "body_color",
+		"ouf": "outfit",
+		"nek": "neck_accesory",
+		"eCo": "eyes_color",
+		"ela": "eyelash",
+		"eli": "eyeliner",
+		"esh": "eyes_shadow_color",
+		"egl": "eyeglasses",
+		"msk": "mask",
+		"brd": "beard",
+		"wig": "wig",
+		"hBa": "headband",
+		"hat": "hat",
+		"stk": "sticker",
+		"sho": "shoes"
+	}
+
 	def __init__(self):
 		self.size = 0.0
 		self.obesity = 0.0
@@ -51,56 +85,140 @@ class PouMinInfo:
 	def from_response(response: dict):
 		"""Fills the attributes of this class from a server response."""
 		min_info = PouMinInfo()
-		min_info.size = response["sz"]
-		min_info.obesity = response["ob"]
 
-		if "mus" in response:
-			min_info.mustache = response["mus"]
+		fields = PouMinInfo.fields
+		for key, value in response.items():
+			attribute = fields.get(key)
+			if attribute is not None:
+				setattr(min_info, attribute, value)
+
+		return min_info
+
+	def to_dict(self):
+		"""Returns the attributes of this class as a dict."""
+		return {attribute: getattr(self, attribute) for attribute in PouMinInfo.__slots__}
+
+class FrozenPouMinInfo(PouMinInfo):
+	"""PouMinInfo that can't be modified, so that a single instance can be
+	shared by every user with the same Pou aspect. Copies return the same
+	instance, and pickling rebuilds it through from_min_info.
+	"""
+	__slots__ = ()
+
+	def __init__(self, min_info: PouMinInfo = None):
+		if min_info is None:
+			min_info = PouMinInfo()
 
-		if "lip" in response:
-			min_info.lipstick = response["lip"]
+		for attribute in PouMinInfo.__slots__:
+			object.__setattr__(self, attribute, getattr(min_info, attribute))
 
-		min_info.body_color = response["bCo"]
+	def __setattr__(self, name, value):
+		raise AttributeError("FrozenPouMinInfo can't be modified")
 
-		if "ouf" in response:
-			min_info.outfit = response["ouf"]
+	def __delattr__(self, name):
+		raise AttributeError("FrozenPouMinInfo can't be modified")
 
-		if "nek" in response:
-			min_info.neck_accesory = response["nek"]
+	def __reduce__(self):
+		min_info = PouMinInfo()
+		for attribute in PouMinInfo.__slots__:
+			setattr(min_info, attribute, getattr(self, attribute))
 
-		min_info.eyes_color = response["eCo"]
+		return FrozenPouMinInfo.from_min_info, (min_info,)
 
-		if "ela" in response:
-			min_info.eyelash = response["ela"]
+	def __copy__(self):
+		return self
 
-		if "eli" in response:
-			min_info.eyeliner = response["eli"]
+	def __deepcopy__(self, memo):
+		return self
 
-		if "esh" in response:
-			min_info.eyes_shadow_color = response["esh"]
+	@staticmethod
+	def from_min_info(min_info: PouMinInfo):
+		"""Returns a frozen copy of a PouMinInfo."""
+		return FrozenPouMinInfo(min_info)
 
-		if "egl" in response:
-			min_info.eyeglasses = response["egl"]
+class MinInfoInterner:
+	"""Intern table that hands back the same FrozenPouMinInfo and the same
+	undecoded string for identical Pou aspects, decoding each of them only
+	once. When the table holds max_size aspects, the least recently used
+	one is dropped.
 
-		if "msk" in response:
-			min_info.mask = response["msk"]
+	Attributes:
+	max_size -- the maximum number of aspects held by the table
+	hits -- the number of aspects found in the table
+	misses -- the number of aspects that had to be decoded
+	entries -- the canonical undecoded aspect and the FrozenPouMinInfo of
+	each interned aspect
+	"""
 
-		if "brd" in response:
-			min_info.beard = response["brd"]
+	def __init__(self, max_size: int = 65536):
+		self.max_size = max_size
+		self.hits = 0
+		self.misses = 0
+		self.entries = collections.OrderedDict()
+
+	def __len__(self):
+		return len(self.entries)
+
+	def intern(self, min_info_raw: str):
+		"""Returns the canonical copy of an undecoded Pou aspect and its shared
+		FrozenPouMinInfo, so that users with the same aspect share both.
+		"""
+		entry = self.entries.get(min_info_raw)
+		if entry is not None:
+			self.entries.move_to_end(min_info_raw)
+			self.hits += 1
+			return entry
+
+		self.misses += 1
+		entry = (min_info_raw, FrozenPouMinInfo.from_min_info(PouMinInfo.from_response(codec.loads(min_info_raw))))
+		self.entries[min_info_raw] = entry
+
+		if len(self.entries) > self.max_size:
+			self.entries.popitem(last = False)
+
+		return entry
+
+	def get(self, min_info_raw: str):
+		"""Returns the shared FrozenPouMinInfo of an undecoded Pou aspect."""
+		return self.intern(min_info_raw)[1]
+
+	def hit_rate(self):
+		"""Returns the fraction of aspects found in the table."""
+		total = self.hits + self.misses
+		return self.hits / total if total else 0.0
+
+class LazyMinInfo:
+	"""Mixin for the models that hold the information about the Pou of a
+	user. The subclass defines the "min_info_raw" and "_min_info" slots, and
+	the information is decoded from min_info_raw on first access.
+	"""
+	__slots__ = ()
 
-		if "wig" in response:
-			min_info.wig = response["wig"]
+	@property
+	def min_info(self):
+		if self._min_info is None:
+			self._min_info = decode_min_info(self.min_info_raw)
 
-		if "hBa" in response:
-			min_info.headband = response["hBa"]
+		return self._min_info
 
-		if "hat" in response:
-			min_info.hat = response["hat"]
+	@min_info.setter
+	def min_info(self, min_info):
+		self._min_info = min_info
 
-		if "stk" in response:
-			min_info.sticker = response["stk"]
+def min_info_to_dict(min_info):
+	"""Returns the attributes of a decoded Pou aspect as a dict, which is
+	empty if the user has no aspect information.
+	"""
+	if isinstance(min_info, PouMinInfo):
+		return min_info.to_dict()
 
-		if "sho" in response:
-			min_info.shoes = response["sho"]
+	return {}
 
-		return min_info
+def decode_min_info(min_info_raw: str):
+	"""Decodes the information about the Pou of a user as sent by the server.
+	Returns a PouMinInfo, or an empty dict if the user has no information.
+	"""
+	if not min_info_raw:
+		return {}
+
+	return PouMinInfo.from_response(codec.loads(min_info_raw))
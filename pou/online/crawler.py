@@ -0,0 +1,226 @@
+# SPDX-FileCopyrightText: 2024 DaniElectra
+#
+# SPDX-License-Identifier: MIT
+
+from pou.online import errors, pagination
+
+import asyncio
+import collections
+import json
+import logging
+import os
+
+_end = object()
+_done = object()
+
+class Crawler:
+	"""Crawls the social graph of the Pou game server breadth-first, starting
+	from a set of seed accounts and following their user lists.
+
+	Every account is expanded at most once. Each worker takes the next
+	account from the frontier as soon as it's free, and the frontier and the
+	seen accounts are written to the checkpoint file every
+	checkpoint_interval expanded accounts, so that an interrupted crawl can
+	be resumed. Accounts whose expansion or records weren't fully consumed
+	are written back to the frontier, and are expanded again on resume.
+
+	Attributes:
+	client -- the client used for the requests
+	lists -- the user lists followed from each account, any of "favorites",
+	"likers" and "visitors"
+	concurrency -- the number of accounts expanded at the same time
+	checkpoint_path -- the file where the progress is stored, or None
+	checkpoint_interval -- the number of accounts expanded between checkpoints
+	max_depth -- the maximum distance from the seeds, or None for no limit
+	frontier -- the accounts waiting to be expanded and their depth
+	seen -- the IDs of all the accounts found so far
+	writer -- the StoreWriter that receives every page, or None
+	logger -- the logger used for the crawler
+	"""
+
+	# Errors that only affect a single account and don't stop the crawl
+	skipped_errors = (errors.ObjectNotFound, errors.PermissionDenied, errors.UserBanned, errors.UserIsMe)
+
+	def __init__(self, client, lists: tuple = ("favorites", "likers"), concurrency: int = 4,
+				 checkpoint_path: str = None, checkpoint_interval: int = 100, max_depth: int = None):
+		self.client = client
+		self.lists = lists
+		self.concurrency = concurrency
+		self.checkpoint_path = checkpoint_path
+		self.checkpoint_interval = checkpoint_interval
+		self.max_depth = max_depth
+		self.frontier = collections.deque()
+		self.seen = set()
+		self.writer = None
+		self.logger = logging.getLogger("Pou crawler")
+
+		self._condition = None
+		self._active = 0
+
+		# The accounts being expanded or with records not yet consumed, with
+		# their depth and the number of pending items, and the accounts found
+		# whose records weren't consumed yet
+		self._open = {}
+		self._pending = set()
+
+	def add_seed(self, account_id: int):
+		"""Adds an account to the frontier unless it has already been seen."""
+		if account_id not in self.seen:
+			self.seen.add(account_id)
+			self.frontier.append((account_id, 0))
+
+	def load_checkpoint(self):
+		"""Restores the frontier and the seen accounts from the checkpoint file.
+		Returns a bool telling if a checkpoint was found.
+		"""
+		if not self.checkpoint_path or not os.path.exists(self.checkpoint_path):
+			return False
+
+		with open(self.checkpoint_path, "r") as f:
+			checkpoint = json.load(f)
+
+		self.frontier = collections.deque((account_id, depth) for account_id, depth in checkpoint["frontier"])
+		self.seen = set(checkpoint["seen"])
+
+		self.logger.info("Resuming crawl with %d accounts on the frontier", len(self.frontier))
+		return True
+
+	def save_checkpoint(self):
+		"""Writes the frontier and the seen accounts to the checkpoint file. The
+		file is replaced atomically, so a crash never leaves it half written.
+		"""
+		if not self.checkpoint_path:
+			return
+
+		# Unconsumed records are left out, so that expanding their account
+		# again on resume finds them as new
+		frontier = [(account_id, node[0]) for account_id, node in self._open.items() if account_id not in self._pending]
+		frontier.extend(node for node in self.frontier if node[0] not in self._pending)
+		checkpoint = {"frontier": frontier, "seen": list(self.seen - self._pending)}
+
+		temp_path = self.checkpoint_path + ".tmp"
+		with open(temp_path, "w") as f:
+			json.dump(checkpoint, f, separators = (",", ":"))
+
+		os.replace(temp_path, self.checkpoint_path)
+
+	async def crawl(self, seeds: list = ()):
+		"""Crawls the graph starting from the given seeds and the last
+		checkpoint, if any. Yields the UserInfo of every new account found, so
+		the records can be processed as a stream.
+		"""
+		self.load_checkpoint()
+		for account_id in seeds:
+			self.add_seed(account_id)
+
+		self._condition = asyncio.Condition()
+		self._active = 0
+		self._open = {}
+		self._pending = set()
+
+		output = asyncio.Queue(maxsize = self.concurrency * 20)
+		task = asyncio.create_task(self._run(output))
+		expanded = 0
+		try:
+			while True:
+				item = await output.get()
+				if item is _end:
+					break
+
+				if isinstance(item, Exception):
+					raise item
+
+				account_id, user_info = item
+				if user_info is _done:
+					expanded += 1
+				else:
+					yield user_info
+					self._pending.discard(user_info.account_id)
+
+				self._release(account_id)
+
+				if user_info is _done and expanded % self.checkpoint_interval == 0:
+					self.save_checkpoint()
+		finally:
+			task.cancel()
+			await asyncio.gather(task, return_exceptions = True)
+
+		self.save_checkpoint()
+
+	def _release(self, account_id: int):
+		node = self._open[account_id]
+		node[1] -= 1
+		if not node[1]:
+			del self._open[account_id]
+
+	async def _run(self, output: asyncio.Queue):
+		workers = [asyncio.create_task(self._worker(output)) for i in range(self.concurrency)]
+		try:
+			await asyncio.gather(*workers)
+		except BaseException as e:
+			# Stop the other workers before reporting the error, so none of
+			# them keeps changing the frontier
+			for worker in workers:
+				worker.cancel()
+
+			await asyncio.gather(*workers, return_exceptions = True)
+
+			if not isinstance(e, Exception):
+				raise
+
+			await output.put(e)
+			return
+
+		await output.put(_end)
+
+	async def _worker(self, output: asyncio.Queue):
+		while True:
+			async with self._condition:
+				# Other workers may still add new accounts to the frontier
+				while not self.frontier and self._active:
+					await self._condition.wait()
+
+				if not self.frontier:
+					self._condition.notify_all()
+					return
+
+				account_id, depth = self.frontier.popleft()
+				self._active += 1
+
+				# Released once the expansion and all its records are consumed
+				self._open[account_id] = [depth, 1]
+
+			try:
+				await self._expand((account_id, depth), output)
+				await output.put((account_id, _done))
+			finally:
+				async with self._condition:
+					self._active -= 1
+					self._condition.notify_all()
+
+	async def _expand(self, node: tuple, output: asyncio.Queue):
+		account_id, depth = node
+
+		for list_name in self.lists:
+			fetch = getattr(self.client, list_name)
+			try:
+				async for page in pagination.iter_pages(fetch, account_id):
+					if self.writer is not None:
+						await self.writer.add_page(list_name, account_id, page.items)
+
+					for user_info in page.items:
+						if user_info.account_id in self.seen:
+							continue
+
+						self.seen.add(user_info.account_id)
+						if self.max_depth is None or depth < self.max_depth:
+							self.frontier.append((user_info.account_id, depth + 1))
+
+						self._pending.add(user_info.account_id)
+						self._open[account_id][1] += 1
+						await output.put((account_id, user_info))
+
+					async with self._condition:
+						self._condition.notify_all()
+			except self.skipped_errors as e:
+				self.logger.info("Skipping %s of account %d: %s", list_name, account_id, e.message)
@@ -98,6 +98,19 @@ class InvalidRequest(Exception):
 	def __init__(self, message: str):
 		self.message = message
 
+class InvalidResponse(Exception):
+	"""Raised if the server returns a response that isn't valid JSON, like
+	the error page of a proxy or a gateway.
+
+	Attributes:
+	message -- a description of the error
+	status -- the HTTP status code of the response
+	"""
+
+	def __init__(self, message: str, status: int):
+		self.message = message
+		self.status = status
+
 class NicknameNotAvailable(Exception):
 	"""Raised if the nickname that a user tried to use is taken and not
 	available.
@@ -0,0 +1,182 @@
+# SPDX-FileCopyrightText: 2024 DaniElectra
+#
+# SPDX-License-Identifier: MIT
+
+from pou.online import codec
+
+import gzip
+
+def _open(path: str, mode: str, compress: bool):
+	if compress:
+		return gzip.open(path, mode + "b", compresslevel = 6)
+
+	return open(path, mode + "b")
+
+def _to_dict(record):
+	if isinstance(record, dict):
+		return record
+
+	return record.to_dict()
+
+def _flatten(record: dict, prefix: str = "", row: dict = None):
+	if row is None:
+		row = {}
+
+	for key, value in record.items():
+		if isinstance(value, dict):
+			_flatten(value, prefix + key + ".", row)
+		else:
+			row[prefix + key] = value
+
+	return row
+
+class NDJSONWriter:
+	"""Streams records to a file with one JSON object per line. The records
+	can be UserInfo, UserScoreInfo, AccountInfo or plain dicts.
+
+	Lines are buffered and written every batch_size records, so the memory
+	used doesn't depend on the number of records. The file itself is only
+	flushed by flush and close.
+
+	Attributes:
+	path -- the path of the file
+	compress -- if the file is compressed with gzip
+	batch_size -- the number of records written at once
+	count -- the number of records written so far
+	"""
+
+	def __init__(self, path: str, compress: bool = False, batch_size: int = 1000):
+		self.path = path
+		self.compress = compress
+		self.batch_size = batch_size
+		self.count = 0
+		self.file = _open(path, "w", compress)
+		self.buffer = []
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, *args):
+		self.close()
+
+	def write(self, record):
+		"""Adds a record to the file."""
+		self.buffer.append(codec.dumps_bytes(_to_dict(record)))
+		if len(self.buffer) >= self.batch_size:
+			self._write_batch()
+
+	def write_all(self, records):
+		"""Adds every record of an iterable to the file."""
+		for record in records:
+			self.write(record)
+
+	def _write_batch(self):
+		if self.buffer:
+			self.buffer.append(b"")
+			self.file.write(b"\n".join(self.buffer))
+			self.count += len(self.buffer) - 1
+			self.buffer.clear()
+
+	def flush(self):
+		"""Writes the buffered records and flushes the file. A compressed file
+		is compressed worse after each flush, so it's better to only flush
+		when the records must be readable before the file is closed.
+		"""
+		self._write_batch()
+		self.file.flush()
+
+	def close(self):
+		"""Writes the buffered records and closes the file."""
+		self._write_batch()
+		self.file.close()
+
+class ColumnarWriter:
+	"""Streams records to a file in a columnar layout. Every batch_size
+	records, a row group is written as one JSON line holding a list of
+	values per column. Nested dicts such as min_info are flattened into
+	columns like "min_info.size".
+
+	Attributes:
+	path -- the path of the file
+	compress -- if the file is compressed with gzip
+	batch_size -- the number of records of each row group
+	count -- the number of records written so far
+	"""
+
+	def __init__(self, path: str, compress: bool = False, batch_size: int = 10000):
+		self.path = path
+		self.compress = compress
+		self.batch_size = batch_size
+		self.count = 0
+		self.file = _open(path, "w", compress)
+		self.columns = {}
+		self.rows = 0
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, *args):
+		self.close()
+
+	def write(self, record):
+		"""Adds a record to the file."""
+		row = _flatten(_to_dict(record))
+
+		for name, value in row.items():
+			column = self.columns.get(name)
+			if column is None:
+				# The column is missing on the previous rows of the group
+				column = self.columns[name] = [None] * self.rows
+
+			column.append(value)
+
+		self.rows += 1
+		for column in self.columns.values():
+			if len(column) < self.rows:
+				column.append(None)
+
+		if self.rows >= self.batch_size:
+			self._write_batch()
+
+	def write_all(self, records):
+		"""Adds every record of an iterable to the file."""
+		for record in records:
+			self.write(record)
+
+	def _write_batch(self):
+		if self.rows:
+			group = {"rows": self.rows, "columns": self.columns}
+			self.file.write(codec.dumps_bytes(group) + b"\n")
+			self.count += self.rows
+			self.columns = {}
+			self.rows = 0
+
+	def flush(self):
+		"""Writes the buffered records as a row group and flushes the file. A
+		compressed file is compressed worse after each flush, so it's better
+		to only flush when the records must be readable before the file is
+		closed.
+		"""
+		self._write_batch()
+		self.file.flush()
+
+	def close(self):
+		"""Writes the buffered records and closes the file."""
+		self._write_batch()
+		self.file.close()
+
+def read_ndjson(path: str, compress: bool = False):
+	"""Yields the records of a file written by NDJSONWriter as dicts."""
+	with _open(path, "r", compress) as f:
+		for line in f:
+			if line.strip():
+				yield codec.loads(line)
+
+def read_columnar(path: str, compress: bool = False):
+	"""Yields the row groups of a file written by ColumnarWriter, each as a
+	dict of lists by column name.
+	"""
+	with _open(path, "r", compress) as f:
+		for line in f:
+			if line.strip():
+				yield codec.loads(line)["columns"]
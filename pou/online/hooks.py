@@ -0,0 +1,45 @@
+# SPDX-FileCopyrightText: 2024 DaniElectra
+#
+# SPDX-License-Identifier: MIT
+
+import inspect
+
+class RequestEvent:
+	"""Describes a request sent to the server, passed to the request hooks
+	before it's sent and to the response hooks once it's done.
+
+	Attributes:
+	path -- the endpoint path
+	method -- the HTTP method
+	params -- the query parameters
+	payload_size -- the size of the request body
+	status -- the HTTP status code, or None if no response was received
+	response_size -- the size of the response body
+	elapsed -- the seconds spent on the request, or None before it's done
+	decode_time -- the seconds spent decoding the response JSON
+	error -- the exception raised by the request, or None
+	"""
+	__slots__ = (
+		"path", "method", "params", "payload_size", "status", "response_size",
+		"elapsed", "decode_time", "error"
+	)
+
+	def __init__(self, path: str, method: str, params: dict, payload_size: int):
+		self.path = path
+		self.method = method
+		self.params = params
+		self.payload_size = payload_size
+		self.status = None
+		self.response_size = 0
+		self.elapsed = None
+		self.decode_time = 0.0
+		self.error = None
+
+async def fire(hooks: list, event: RequestEvent):
+	"""Calls every hook with the event, awaiting the hooks that are
+	coroutine functions or return an awaitable.
+	"""
+	for hook in hooks:
+		result = hook(event)
+		if inspect.isawaitable(result):
+			await result
@@ -0,0 +1,124 @@
+# SPDX-FileCopyrightText: 2024 DaniElectra
+#
+# SPDX-License-Identifier: MIT
+
+import asyncio
+import time
+
+PERIODS = ("today", "week", "month", "alltime")
+
+class ScoreDelta:
+	"""Holds the change of a user on a leaderboard since the previous
+	snapshot.
+
+	Attributes:
+	account_id -- the account ID of the user
+	nickname -- the user nickname
+	rank -- the rank of the user, starting from 1
+	score -- the score of the user
+	rank_delta -- the ranks gained since the previous snapshot, or None if
+	the user wasn't on the leaderboard
+	score_delta -- the score gained since the previous snapshot, or None if
+	the user wasn't on the leaderboard
+	"""
+	__slots__ = ("account_id", "nickname", "rank", "score", "rank_delta", "score_delta")
+
+	def __init__(self):
+		self.account_id = 0
+		self.nickname = ""
+		self.rank = 0
+		self.score = 0
+		self.rank_delta = None
+		self.score_delta = None
+
+class Snapshot:
+	"""Holds the leaderboards of every game and period at a point in time, and
+	their changes since the previous snapshot.
+
+	Attributes:
+	timestamp -- the Unix timestamp when the snapshot started
+	boards -- the UserScoreInfo list of each (game ID, period)
+	deltas -- the ScoreDelta list of each (game ID, period)
+	dropped -- the account IDs that left each (game ID, period)
+	errors -- the exception raised by each leaderboard that failed
+	"""
+
+	def __init__(self):
+		self.timestamp = 0
+		self.boards = {}
+		self.deltas = {}
+		self.dropped = {}
+		self.errors = {}
+
+class LeaderboardSnapshotter:
+	"""Fetches the leaderboards of every game and period concurrently, and
+	computes the rank and score changes of each leaderboard against the
+	previous snapshot as soon as it's received.
+
+	Only the rank and score of each user of the last snapshot are kept
+	between snapshots.
+
+	Attributes:
+	client -- the client used for the requests
+	game_ids -- the IDs of the games
+	periods -- the periods of each game
+	concurrency -- the maximum number of leaderboards fetched at once
+	previous -- the rank and score of each account on the last snapshot,
+	by (game ID, period)
+	"""
+
+	def __init__(self, client, game_ids: list, periods: tuple = PERIODS, concurrency: int = 8):
+		self.client = client
+		self.game_ids = game_ids
+		self.periods = periods
+		self.concurrency = concurrency
+		self.previous = {}
+
+	async def snapshot(self):
+		"""Takes a snapshot of every leaderboard. Returns a Snapshot."""
+		snapshot = Snapshot()
+		snapshot.timestamp = int(time.time())
+
+		semaphore = asyncio.Semaphore(self.concurrency)
+
+		async def fetch(board: tuple):
+			async with semaphore:
+				try:
+					return board, await self.client.top_scores(*board), None
+				except Exception as e:
+					return board, None, e
+
+		boards = [(game_id, period) for game_id in self.game_ids for period in self.periods]
+		for future in asyncio.as_completed([fetch(board) for board in boards]):
+			board, scores, error = await future
+			if error is not None:
+				snapshot.errors[board] = error
+			elif scores is not None:
+				snapshot.boards[board] = scores
+				self._update(snapshot, board, scores)
+
+		return snapshot
+
+	def _update(self, snapshot: Snapshot, board: tuple, scores: list):
+		previous = self.previous.get(board, {})
+		current = {}
+
+		deltas = []
+		for rank, user_score_info in enumerate(scores, 1):
+			delta = ScoreDelta()
+			delta.account_id = user_score_info.account_id
+			delta.nickname = user_score_info.nickname
+			delta.rank = rank
+			delta.score = user_score_info.score
+
+			if delta.account_id in previous:
+				previous_rank, previous_score = previous[delta.account_id]
+				delta.rank_delta = previous_rank - rank
+				delta.score_delta = delta.score - previous_score
+
+			deltas.append(delta)
+			current[delta.account_id] = (rank, delta.score)
+
+		snapshot.deltas[board] = deltas
+		snapshot.dropped[board] = [account_id for account_id in previous if account_id not in current]
+		self.previous[board] = current
@@ -0,0 +1,286 @@
+# SPDX-FileCopyrightText: 2024 DaniElectra
+#
+# SPDX-License-Identifier: MIT
+
+"""Load generator for Pou game servers. It runs many simulated PouClient
+sessions against a host, each one starting scenarios from a weighted mix
+on a fixed schedule, and reports the achieved rate, the throughput, the
+latency percentiles of each scenario and endpoint and the errors by type.
+
+Usage: python -m pou.online.loadgen --host http://127.0.0.1:8080 --sessions 50 --rate 200
+"""
+
+from pou.online import client, errors, metrics, server, transport
+
+import argparse
+import asyncio
+import json
+import random
+import time
+
+scenarios = ("login", "account_info", "save", "top_likes", "top_scores", "likers")
+
+default_mix = {"login": 1, "account_info": 3, "save": 1, "top_likes": 2, "top_scores": 2, "likers": 3}
+
+# The error type returned by the server for each exception class
+error_types = {error: error_type for error_type, error in errors.pou_errors.items()}
+
+def parse_mix(text: str):
+	"""Parses a scenario mix like "login=1,save=2" into a dict of weights."""
+	mix = {}
+	for item in text.split(","):
+		name, _, weight = item.partition("=")
+		name = name.strip()
+		if name not in scenarios:
+			raise ValueError("Unknown scenario: %s" % name)
+
+		mix[name] = float(weight) if weight else 1.0
+
+	return mix
+
+class LoginFailed(Exception):
+	"""Raised by the login scenario when the server doesn't accept the login."""
+
+class LoadResult:
+	"""Holds the results of a load test.
+
+	Attributes:
+	duration -- the seconds during which scenarios were started
+	elapsed -- the seconds the load test ran, including the wait for the
+	scenarios still running at the end
+	target_rate -- the number of scenarios per second that was requested
+	started -- the number of scenarios started
+	dropped -- the number of scenarios not started because their session
+	had too many scenarios running
+	metrics -- the Metrics of every request, merged from all the sessions
+	scenarios -- the Metrics of every scenario, by scenario name. The
+	latency counts from the time the scenario was scheduled to start
+	errors -- the number of failed scenarios, by error type
+	"""
+
+	def __init__(self):
+		self.duration = 0.0
+		self.elapsed = 0.0
+		self.target_rate = 0.0
+		self.started = 0
+		self.dropped = 0
+		self.metrics = metrics.Metrics()
+		self.scenarios = metrics.Metrics()
+		self.errors = {}
+
+	def record(self, scenario: str, latency: float, error: Exception = None):
+		"""Records a finished scenario."""
+		self.scenarios.record(scenario, latency, 0, error)
+		if error is not None:
+			name = error_types.get(type(error), type(error).__name__)
+			self.errors[name] = self.errors.get(name, 0) + 1
+
+	def to_dict(self):
+		"""Returns the results as a dict."""
+		requests = sum(endpoint.count for endpoint in self.metrics.endpoints.values())
+		return {
+			"duration": self.duration,
+			"elapsed": self.elapsed,
+			"target_rate": self.target_rate,
+			"achieved_rate": self.started / self.duration if self.duration else 0.0,
+			"started": self.started,
+			"dropped": self.dropped,
+			"requests": requests,
+			"throughput": requests / self.elapsed if self.elapsed else 0.0,
+			"scenarios": self.scenarios.snapshot(),
+			"errors": dict(self.errors),
+			"endpoints": self.metrics.snapshot()
+		}
+
+class LoadGenerator:
+	"""Runs simulated client sessions against a Pou game server.
+
+	Each session has its own PouClient and starts scenarios chosen at random
+	from the mix on a fixed schedule, so that all the sessions together
+	start about rate scenarios per second. A scenario doesn't wait for the
+	previous ones to finish, so a slow server doesn't lower the rate sent
+	to it. Up to max_in_flight scenarios run at once per session; the
+	scenarios scheduled beyond that are dropped and counted.
+
+	The latency of a scenario counts from the time it was scheduled to
+	start, so any delay caused by the load generator falling behind shows
+	in the percentiles too.
+
+	Attributes:
+	host -- the server host
+	sessions -- the number of simulated sessions
+	rate -- the target number of scenarios per second of all the sessions
+	mix -- the weight of each scenario
+	max_in_flight -- the maximum number of scenarios running at once in a
+	session
+	accounts -- the (email, password) of the accounts that the sessions log
+	in to, assigned in turns; sessions without one skip the account scenarios
+	account_ids -- the range of account IDs used by the likers scenario
+	pages -- the maximum number of pages fetched by the likers scenario
+	save_state -- the game state uploaded by the save scenario
+	result -- the LoadResult of the load test
+	"""
+
+	def __init__(self, host: str, sessions: int = 10, rate: float = 50.0, mix: dict = None, max_in_flight: int = 10):
+		self.host = host
+		self.sessions = sessions
+		self.rate = rate
+		self.mix = mix or default_mix
+		self.max_in_flight = max_in_flight
+		self.accounts = []
+		self.account_ids = (1, 1000)
+		self.pages = 5
+		self.save_state = server.make_save_state(16)
+		self.result = LoadResult()
+
+	async def run(self, duration: float):
+		"""Starts scenarios for the given number of seconds, and waits for the
+		ones still running. Returns the LoadResult.
+		"""
+		self.result.target_rate = self.rate
+
+		start = time.monotonic()
+		deadline = start + duration
+		await asyncio.gather(*[self._session(index, deadline) for index in range(self.sessions)])
+
+		self.result.duration = duration
+		self.result.elapsed = time.monotonic() - start
+		return self.result
+
+	async def _session(self, index: int, deadline: float):
+		rng = random.Random(index)
+
+		pou_client = client.PouClient()
+		pou_client.host = self.host
+		pou_client.retry_policy = None
+		pou_client.single_flight = None
+		# Enough connections for every scenario that can run at once
+		pou_client.transport.close()
+		pou_client.transport = transport.RequestsTransport(pou_client.session, self.max_in_flight)
+		session_metrics = pou_client.enable_metrics()
+
+		account = self.accounts[index % len(self.accounts)] if self.accounts else None
+		mix = self.mix
+		if account is None:
+			mix = {name: weight for name, weight in mix.items() if name not in ("login", "account_info", "save")}
+
+		names = list(mix)
+		weights = list(mix.values())
+		interval = self.sessions / self.rate
+
+		running = set()
+		try:
+			if account is not None:
+				await self._run_scenario(pou_client, "login", account, rng, time.monotonic())
+
+			# Spread the sessions over the first interval
+			next_time = time.monotonic() + rng.random() * interval
+			while next_time < deadline:
+				delay = next_time - time.monotonic()
+				if delay > 0:
+					await asyncio.sleep(delay)
+
+				if len(running) >= self.max_in_flight:
+					self.result.dropped += 1
+				else:
+					scenario = rng.choices(names, weights)[0]
+					task = asyncio.create_task(self._run_scenario(pou_client, scenario, account, rng, next_time))
+					running.add(task)
+					task.add_done_callback(running.discard)
+					self.result.started += 1
+
+				next_time += interval
+
+			if running:
+				await asyncio.gather(*running)
+		finally:
+			for task in running:
+				task.cancel()
+
+			pou_client.close()
+			self.result.metrics.merge(session_metrics)
+
+	async def _run_scenario(self, pou_client: client.PouClient, scenario: str, account: tuple, rng: random.Random, scheduled: float):
+		try:
+			if scenario == "login":
+				if await pou_client.login(*account) is None:
+					raise LoginFailed("The server didn't accept the login of %s" % account[0])
+			elif scenario == "account_info":
+				await pou_client.account_info()
+			elif scenario == "save":
+				await pou_client.save(self.save_state, {"sz": 1.0})
+			elif scenario == "top_likes":
+				await pou_client.top_likes()
+			elif scenario == "top_scores":
+				await pou_client.top_scores(rng.randrange(1, 20), rng.choice(("today", "week", "month", "alltime")))
+			elif scenario == "likers":
+				account_id = rng.randint(*self.account_ids)
+				since = 0
+				for page_number in range(self.pages):
+					page = await pou_client.likers(account_id, since)
+					if page is None or not page.next:
+						break
+
+					since = page.next
+		except Exception as e:
+			self.result.record(scenario, time.monotonic() - scheduled, e)
+		else:
+			self.result.record(scenario, time.monotonic() - scheduled)
+
+def _print_latencies(title: str, snapshot: dict):
+	print("%-32s %8s %9s %9s %9s %8s" % (title, "count", "p50 ms", "p95 ms", "p99 ms", "errors"))
+	for name, entry in sorted(snapshot.items()):
+		print("%-32s %8d %9.1f %9.1f %9.1f %8d" % (
+			name, entry["count"], entry["p50"] * 1000, entry["p95"] * 1000, entry["p99"] * 1000,
+			sum(entry["errors"].values())
+		))
+
+def print_report(result: LoadResult):
+	report = result.to_dict()
+	print("Target rate: %.1f scenarios/s, achieved: %.1f scenarios/s (%d started, %d dropped)" % (
+		report["target_rate"], report["achieved_rate"], report["started"], report["dropped"]
+	))
+	print("Elapsed: %.1f s, requests: %d, throughput: %.1f req/s" % (report["elapsed"], report["requests"], report["throughput"]))
+
+	print()
+	_print_latencies("scenario", report["scenarios"])
+
+	print()
+	_print_latencies("endpoint", report["endpoints"])
+
+	if report["errors"]:
+		print()
+		print("%-32s %8s" % ("error", "count"))
+		for name, count in sorted(report["errors"].items(), key = lambda item: -item[1]):
+			print("%-32s %8d" % (name, count))
+
+def main():
+	parser = argparse.ArgumentParser(description = "Load generator for Pou game servers")
+	parser.add_argument("--host", default = "http://127.0.0.1:8080", help = "server host")
+	parser.add_argument("--sessions", type = int, default = 10, help = "number of simulated sessions")
+	parser.add_argument("--rate", type = float, default = 50.0, help = "target scenarios per second of all the sessions")
+	parser.add_argument("--duration", type = float, default = 30.0, help = "seconds the load test runs")
+	parser.add_argument("--mix", type = parse_mix, help = "scenario weights, like login=1,account_info=3,likers=2")
+	parser.add_argument("--max-in-flight", type = int, default = 10, help = "maximum scenarios running at once per session")
+	parser.add_argument("--account", action = "append", default = [], metavar = "EMAIL:PASSWORD", help = "account used by the sessions")
+	parser.add_argument("--max-account-id", type = int, default = 1000, help = "highest account ID used by the likers scenario")
+	parser.add_argument("--pages", type = int, default = 5, help = "maximum pages fetched by the likers scenario")
+	parser.add_argument("--state-kb", type = int, default = 16, help = "size of the state uploaded by the save scenario")
+	parser.add_argument("--output", help = "file where the results are written as JSON")
+	args = parser.parse_args()
+
+	generator = LoadGenerator(args.host, args.sessions, args.rate, args.mix, args.max_in_flight)
+	generator.accounts = [tuple(account.split(":", 1)) for account in args.account]
+	generator.account_ids = (1, args.max_account_id)
+	generator.pages = args.pages
+	generator.save_state = server.make_save_state(args.state_kb)
+
+	result = asyncio.run(generator.run(args.duration))
+	print_report(result)
+
+	if args.output:
+		with open(args.output, "w") as f:
+			json.dump(result.to_dict(), f, indent = 2)
+
+if __name__ == "__main__":
+	main()
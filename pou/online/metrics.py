@@ -0,0 +1,146 @@
+# SPDX-FileCopyrightText: 2024 DaniElectra
+#
+# SPDX-License-Identifier: MIT
+
+import bisect
+
+# Upper bounds of the latency histogram buckets, in seconds
+BUCKETS = (
+	0.001, 0.0025, 0.005, 0.0075, 0.01, 0.015, 0.025, 0.035, 0.05, 0.075,
+	0.1, 0.15, 0.25, 0.35, 0.5, 0.75, 1.0, 1.5, 2.5, 5.0, 10.0, 30.0, 60.0
+)
+
+class EndpointMetrics:
+	"""Holds the metrics of the requests to a single endpoint path.
+
+	Attributes:
+	count -- the number of requests sent
+	latency_buckets -- the number of requests per latency bucket, plus one
+	for the requests slower than the last bucket
+	latency_sum -- the total latency of the requests, in seconds
+	response_bytes -- the total size of the response bodies
+	errors -- the number of requests that failed, by exception class name
+	"""
+	__slots__ = ("count", "latency_buckets", "latency_sum", "response_bytes", "errors")
+
+	def __init__(self):
+		self.count = 0
+		self.latency_buckets = [0] * (len(BUCKETS) + 1)
+		self.latency_sum = 0.0
+		self.response_bytes = 0
+		self.errors = {}
+
+	def percentile(self, fraction: float):
+		"""Estimates a latency percentile from the histogram, interpolating
+		linearly inside the bucket where it falls.
+		"""
+		if not self.count:
+			return 0.0
+
+		target = fraction * self.count
+		seen = 0
+		for index, bucket_count in enumerate(self.latency_buckets):
+			if bucket_count and seen + bucket_count >= target:
+				lower = BUCKETS[index - 1] if index > 0 else 0.0
+				upper = BUCKETS[index] if index < len(BUCKETS) else BUCKETS[-1]
+				return lower + (upper - lower) * (target - seen) / bucket_count
+
+			seen += bucket_count
+
+		return BUCKETS[-1]
+
+class Metrics:
+	"""Collects the number of requests, a latency histogram, the response
+	sizes and the errors of each endpoint path of a client.
+
+	Attributes:
+	endpoints -- the EndpointMetrics of each path
+	"""
+
+	def __init__(self):
+		self.endpoints = {}
+
+	def record(self, path: str, latency: float, size: int, error: Exception = None):
+		"""Records a request to the given path."""
+		endpoint = self.endpoints.get(path)
+		if endpoint is None:
+			endpoint = self.endpoints[path] = EndpointMetrics()
+
+		endpoint.count += 1
+		endpoint.latency_buckets[bisect.bisect_left(BUCKETS, latency)] += 1
+		endpoint.latency_sum += latency
+		endpoint.response_bytes += size
+
+		if error is not None:
+			name = type(error).__name__
+			endpoint.errors[name] = endpoint.errors.get(name, 0) + 1
+
+	def merge(self, other):
+		"""Adds the metrics of another Metrics to these ones."""
+		for path, other_endpoint in other.endpoints.items():
+			endpoint = self.endpoints.get(path)
+			if endpoint is None:
+				endpoint = self.endpoints[path] = EndpointMetrics()
+
+			endpoint.count += other_endpoint.count
+			for index, bucket_count in enumerate(other_endpoint.latency_buckets):
+				endpoint.latency_buckets[index] += bucket_count
+
+			endpoint.latency_sum += other_endpoint.latency_sum
+			endpoint.response_bytes += other_endpoint.response_bytes
+			for name, error_count in other_endpoint.errors.items():
+				endpoint.errors[name] = endpoint.errors.get(name, 0) + error_count
+
+	def reset(self):
+		"""Clears all the metrics."""
+		self.endpoints.clear()
+
+	def snapshot(self):
+		"""Returns the metrics of every path as a dict."""
+		snapshot = {}
+		for path, endpoint in self.endpoints.items():
+			snapshot[path] = {
+				"count": endpoint.count,
+				"p50": endpoint.percentile(0.50),
+				"p95": endpoint.percentile(0.95),
+				"p99": endpoint.percentile(0.99),
+				"latency_sum": endpoint.latency_sum,
+				"response_bytes": endpoint.response_bytes,
+				"errors": dict(endpoint.errors)
+			}
+
+		return snapshot
+
+	def prometheus(self):
+		"""Returns the metrics in the Prometheus text exposition format."""
+		lines = [
+			"# HELP pou_requests_total Requests sent to the Pou server.",
+			"# TYPE pou_requests_total counter"
+		]
+		for path, endpoint in self.endpoints.items():
+			lines.append('pou_requests_total{path="%s"} %d' % (path, endpoint.count))
+
+		lines.append("# HELP pou_request_duration_seconds Latency of the requests to the Pou server.")
+		lines.append("# TYPE pou_request_duration_seconds histogram")
+		for path, endpoint in self.endpoints.items():
+			cumulative = 0
+			for bound, bucket_count in zip(BUCKETS, endpoint.latency_buckets):
+				cumulative += bucket_count
+				lines.append('pou_request_duration_seconds_bucket{path="%s",le="%g"} %d' % (path, bound, cumulative))
+
+			lines.append('pou_request_duration_seconds_bucket{path="%s",le="+Inf"} %d' % (path, endpoint.count))
+			lines.append('pou_request_duration_seconds_sum{path="%s"} %f' % (path, endpoint.latency_sum))
+			lines.append('pou_request_duration_seconds_count{path="%s"} %d' % (path, endpoint.count))
+
+		lines.append("# HELP pou_response_bytes_total Size of the response bodies of the Pou server.")
+		lines.append("# TYPE pou_response_bytes_total counter")
+		for path, endpoint in self.endpoints.items():
+			lines.append('pou_response_bytes_total{path="%s"} %d' % (path, endpoint.response_bytes))
+
+		lines.append("# HELP pou_errors_total Requests to the Pou server that failed, by exception.")
+		lines.append("# TYPE pou_errors_total counter")
+		for path, endpoint in self.endpoints.items():
+			for name, error_count in endpoint.errors.items():
+				lines.append('pou_errors_total{path="%s",error="%s"} %d' % (path, name, error_count))
+
+		return "\n".join(lines) + "\n"
@@ -0,0 +1,67 @@
+# SPDX-FileCopyrightText: 2024 DaniElectra
+#
+# SPDX-License-Identifier: MIT
+
+import asyncio
+
+_end = object()
+
+async def iter_pages(fetch, account_id: int, since: int = 0, prefetch: int = 1):
+	"""Yields every page of a user list, following the "next" argument of
+	each page until the server stops providing one.
+
+	The fetch argument is an endpoint of the client such as
+	PouClient.likers. The pages are fetched by a background task while the
+	current one is consumed. At most prefetch pages ahead of the current one
+	are fetched or being fetched at once, so the task waits for the
+	consumer before fetching more.
+	"""
+	if prefetch < 1:
+		raise ValueError("prefetch must be at least 1")
+
+	queue = asyncio.Queue()
+	slots = asyncio.Semaphore(prefetch)
+
+	async def producer():
+		cursor = since
+		try:
+			while True:
+				await slots.acquire()
+				page = await fetch(account_id, cursor)
+				if page is None:
+					break
+
+				queue.put_nowait(page)
+
+				if not page.next or not page.items:
+					break
+
+				cursor = page.next
+		except Exception as e:
+			queue.put_nowait(e)
+			return
+
+		queue.put_nowait(_end)
+
+	task = asyncio.create_task(producer())
+	try:
+		while True:
+			page = await queue.get()
+			if page is _end:
+				break
+
+			if isinstance(page, Exception):
+				raise page
+
+			slots.release()
+			yield page
+	finally:
+		task.cancel()
+
+async def iter_users(fetch, account_id: int, since: int = 0, prefetch: int = 1):
+	"""Yields the UserInfo of every user of a user list across all of its
+	pages. See iter_pages for the meaning of the arguments.
+	"""
+	async for page in iter_pages(fetch, account_id, since, prefetch):
+		for user_info in page.items:
+			yield user_info
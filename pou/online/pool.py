@@ -0,0 +1,157 @@
+# SPDX-FileCopyrightText: 2024 DaniElectra
+#
+# SPDX-License-Identifier: MIT
+
+from pou.online import errors, pagination
+from pou.online.client import PouClient
+
+import datetime
+import logging
+
+class PooledAccount:
+	"""Holds a client logged into one of the accounts of a ClientPool, and the
+	requests it has made during the current day.
+
+	Attributes:
+	client -- the client logged into the account
+	email -- the account email address
+	used -- the number of requests made during the current day
+	exhausted -- if the server has refused more requests for today
+	"""
+
+	def __init__(self, client: PouClient, email: str):
+		self.client = client
+		self.email = email
+		self.used = 0
+		self.exhausted = False
+
+class ClientPool:
+	"""Spreads read-only requests across multiple accounts, so that the daily
+	request limit of the server applies to each account separately.
+
+	Each request is sent by the available account that has made the fewest
+	requests today. An account leaves the rotation once it uses its daily
+	budget or the server raises TooManySocialActions, and comes back when
+	the day changes (in UTC).
+
+	Attributes:
+	accounts -- the accounts of the pool
+	daily_limit -- the number of requests each account can make per day
+	day -- the day the request counters belong to
+	client_factory -- the function that creates the client of each account
+	logged in by the pool, for example to set its host or version
+	logger -- the logger used for the pool
+	"""
+
+	def __init__(self, daily_limit: int = 5000, client_factory = PouClient):
+		self.accounts = []
+		self.daily_limit = daily_limit
+		self.client_factory = client_factory
+		self.day = self._today()
+		self.logger = logging.getLogger("Pou client pool")
+
+	@staticmethod
+	def _today():
+		return datetime.datetime.now(datetime.timezone.utc).date()
+
+	def add_client(self, client: PouClient, email: str = ""):
+		"""Adds a client that is already logged in to the pool."""
+		self.accounts.append(PooledAccount(client, email))
+
+	async def login(self, email: str, password: str):
+		"""Logs into an account with a new client made by the client factory
+		and adds it to the pool. Returns the UserLogin of the account, or None
+		if the login fails.
+		"""
+		client = self.client_factory()
+		user_login = await client.login(email, password)
+
+		if user_login is None:
+			client.close()
+			return None
+
+		self.add_client(client, email)
+		return user_login
+
+	def remaining(self):
+		"""Returns the number of requests that the pool can still make today."""
+		self._check_day()
+		return sum(self.daily_limit - account.used for account in self.accounts if not account.exhausted)
+
+	def close(self):
+		"""Closes the connections of every client of the pool."""
+		for account in self.accounts:
+			account.client.close()
+
+	def _check_day(self):
+		today = self._today()
+		if today != self.day:
+			self.day = today
+			for account in self.accounts:
+				account.used = 0
+				account.exhausted = False
+
+	def _pick(self):
+		self._check_day()
+
+		best = None
+		for account in self.accounts:
+			if account.exhausted or account.used >= self.daily_limit:
+				continue
+
+			if best is None or account.used < best.used:
+				best = account
+
+		if best is None:
+			raise errors.TooManySocialActions("Every account of the pool has reached its daily limit")
+
+		return best
+
+	async def _call(self, endpoint: str, *args):
+		while True:
+			account = self._pick()
+			account.used += 1
+
+			try:
+				return await getattr(account.client, endpoint)(*args)
+			except errors.TooManySocialActions:
+				self.logger.info("Account %s reached the daily limit after %d requests", account.email, account.used)
+				account.exhausted = True
+
+	async def top_likes(self):
+		"""Same as PouClient.top_likes, using the least used account."""
+		return await self._call("top_likes")
+
+	async def top_scores(self, game_id: int, period: str):
+		"""Same as PouClient.top_scores, using the least used account."""
+		return await self._call("top_scores", game_id, period)
+
+	async def favorites(self, account_id: int, since: int = 0):
+		"""Same as PouClient.favorites, using the least used account."""
+		return await self._call("favorites", account_id, since)
+
+	async def likers(self, account_id: int, since: int = 0):
+		"""Same as PouClient.likers, using the least used account."""
+		return await self._call("likers", account_id, since)
+
+	async def visitors(self, account_id: int, since: int = 0):
+		"""Same as PouClient.visitors, using the least used account."""
+		return await self._call("visitors", account_id, since)
+
+	def iter_favorites(self, account_id: int, since: int = 0, prefetch: int = 1):
+		"""Same as PouClient.iter_favorites, spreading the pages across the
+		accounts of the pool.
+		"""
+		return pagination.iter_users(self.favorites, account_id, since, prefetch)
+
+	def iter_likers(self, account_id: int, since: int = 0, prefetch: int = 1):
+		"""Same as PouClient.iter_likers, spreading the pages across the
+		accounts of the pool.
+		"""
+		return pagination.iter_users(self.likers, account_id, since, prefetch)
+
+	def iter_visitors(self, account_id: int, since: int = 0, prefetch: int = 1):
+		"""Same as PouClient.iter_visitors, spreading the pages across the
+		accounts of the pool.
+		"""
+		return pagination.iter_users(self.visitors, account_id, since, prefetch)
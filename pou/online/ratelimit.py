@@ -0,0 +1,105 @@
+# SPDX-FileCopyrightText: 2024 DaniElectra
+#
+# SPDX-License-Identifier: MIT
+
+import asyncio
+import time
+
+class TokenBucket:
+	"""Token bucket that allows a number of requests per second, with bursts
+	of up to a maximum number of requests.
+
+	Attributes:
+	rate -- the number of tokens added per second
+	burst -- the maximum number of tokens the bucket can hold
+	tokens -- the number of tokens currently available
+	"""
+
+	def __init__(self, rate: float, burst: int):
+		self.rate = rate
+		self.burst = burst
+		self.tokens = float(burst)
+		self.updated = time.monotonic()
+		self.lock = asyncio.Lock()
+
+	def _refill(self):
+		now = time.monotonic()
+		self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+		self.updated = now
+
+	async def acquire(self):
+		"""Waits until a token is available and takes it. Waiters are served in
+		the order they arrive.
+		"""
+		async with self.lock:
+			self._refill()
+			if self.tokens < 1:
+				await asyncio.sleep((1 - self.tokens) / self.rate)
+				self._refill()
+
+			self.tokens -= 1
+
+class RateLimiter:
+	"""Client-side rate limiter with one token bucket per group of endpoints.
+	The bucket of a request is chosen by the longest prefix of the path.
+
+	When the server raises a throttling error, the rate of the bucket is
+	halved. Every successful request then increases it again by a fraction
+	of the configured rate, until it's back to it.
+
+	Attributes:
+	buckets -- the token bucket of each path prefix
+	rates -- the configured rate of each path prefix
+	min_rate -- the lowest rate a bucket can be slowed down to
+	recovery -- the fraction of the configured rate recovered per success
+	"""
+
+	# Requests per second and burst size of each group of endpoints
+	default_rates = {
+		"/ajax/site/": (5.0, 10),
+		"/ajax/account/": (2.0, 5),
+		"/ajax/user/": (5.0, 10)
+	}
+
+	def __init__(self, rates: dict = None, min_rate: float = 0.05, recovery: float = 0.01):
+		if rates is None:
+			rates = self.default_rates
+
+		self.buckets = {}
+		self.rates = {}
+		for prefix, (rate, burst) in rates.items():
+			self.buckets[prefix] = TokenBucket(rate, burst)
+			self.rates[prefix] = rate
+
+		self.min_rate = min_rate
+		self.recovery = recovery
+
+	def _prefix(self, path: str):
+		match = None
+		for prefix in self.buckets:
+			if path.startswith(prefix) and (match is None or len(prefix) > len(match)):
+				match = prefix
+
+		return match
+
+	async def acquire(self, path: str):
+		"""Waits until a request to the given path is allowed."""
+		prefix = self._prefix(path)
+		if prefix is not None:
+			await self.buckets[prefix].acquire()
+
+	def throttled(self, path: str):
+		"""Slows down the requests to the given path after a throttling error."""
+		prefix = self._prefix(path)
+		if prefix is not None:
+			bucket = self.buckets[prefix]
+			bucket.rate = max(self.min_rate, bucket.rate / 2)
+
+	def succeeded(self, path: str):
+		"""Speeds up the requests to the given path after a successful request."""
+		prefix = self._prefix(path)
+		if prefix is not None:
+			bucket = self.buckets[prefix]
+			rate = self.rates[prefix]
+			if bucket.rate < rate:
+				bucket.rate = min(rate, bucket.rate + rate * self.recovery)
@@ -2,29 +2,14 @@
 #
 # SPDX-License-Identifier: MIT
 
-from pou.online import errors
-import requests
-
-def pou_request(client, path, method, params = None, payload = None):
-	'''Makes a request to Pou game servers. Returns a dict unless the server
-	returns an error, for which an Exception will be thrown.'''
-	request_params = {
-		"_a": client.api,
-		"_c": client.c,
-		"_v": client.version,
-		"_r": client.revision
-	}
-
-	if params:
-		request_params.update(params)
-
-	url = client.host + path
-
-	session = client.session
-
-	response = session.request(method = method, url = url, params = request_params, json = payload)
-	response = response.json()
+from pou.online import codec, errors, hooks
+from pou.online.cache import request_key
+import asyncio
+import time
 
+def check_error(response: dict):
+	'''Raises the Exception matching the error returned by the server, if
+	there is any.'''
 	if "error" in response:
 		error_type = response["error"]["type"]
 		if error_type == "ClientOutdated":
@@ -40,4 +25,129 @@ def pou_request(client, path, method, params = None, payload = None):
 		elif error_type in errors.pou_errors:
 			raise errors.pou_errors[error_type](response["error"]["message"])
 
+async def pou_request(client, path, method, params = None, payload = None):
+	'''Makes a request to Pou game servers. Returns a dict unless the server
+	returns an error, for which an Exception will be thrown.
+
+	The request is sent through the transport of the client, so multiple
+	requests can be awaited concurrently on the same event loop. Identical
+	GET requests that are in flight at the same time share the same
+	response.'''
+	cache = client.cache if method == "GET" else None
+	if cache is not None:
+		response = cache.get(path, params)
+		if response is not None:
+			return response
+
+	if method == "GET" and client.single_flight is not None:
+		key = request_key(path, params)
+		response = await client.single_flight.do(key, lambda: send_request(client, path, method, params, payload))
+	else:
+		response = await send_request(client, path, method, params, payload)
+
+	if cache is not None:
+		cache.put(path, params, response)
+
 	return response
+
+async def send_request(client, path, method, params = None, payload = None):
+	'''Sends a request to Pou game servers through the transport of the
+	client, bypassing the cache and the coalescing of pou_request. GET
+	requests that fail for transient reasons are retried according to the
+	retry policy of the client.'''
+	request_params = {
+		"_a": client.api,
+		"_c": client.c,
+		"_v": client.version,
+		"_r": client.revision
+	}
+
+	if params:
+		request_params.update(params)
+
+	url = client.host + path
+
+	# Payloads that are already encoded are sent as they are
+	data = None
+	headers = None
+	if payload is not None:
+		data = payload if isinstance(payload, bytes) else codec.dumps_bytes(payload)
+		headers = {"Content-Type": "application/json"}
+
+	retry_policy = client.retry_policy if method == "GET" else None
+
+	attempt = 0
+	while True:
+		try:
+			response = await _send_once(client, path, method, url, request_params, data, headers)
+		except Exception as e:
+			if retry_policy is None or not retry_policy.should_retry(e, attempt):
+				raise
+
+			await asyncio.sleep(retry_policy.delay(attempt))
+			attempt += 1
+			continue
+
+		if retry_policy is not None:
+			retry_policy.succeeded()
+
+		return response
+
+async def _send_once(client, path, method, url, request_params, data, headers):
+	rate_limiter = client.rate_limiter
+	if rate_limiter is not None:
+		await rate_limiter.acquire(path)
+
+	# Events are only built when there are hooks to receive them
+	event = None
+	if client.request_hooks or client.response_hooks:
+		event = hooks.RequestEvent(path, method, request_params, len(data) if data else 0)
+		await hooks.fire(client.request_hooks, event)
+
+	metrics = client.metrics
+	if metrics is not None or event is not None:
+		start = time.perf_counter()
+
+	size = 0
+	try:
+		response = await client.transport.send(method, url, request_params, data, headers)
+		size = len(response.content)
+
+		if event is not None:
+			event.status = response.status
+			event.response_size = size
+			decode_start = time.perf_counter()
+
+		try:
+			decoded = codec.loads(response.content)
+		except ValueError:
+			raise errors.InvalidResponse("The server returned a response that isn't JSON", response.status)
+
+		if event is not None:
+			event.decode_time = time.perf_counter() - decode_start
+
+		check_error(decoded)
+	except Exception as e:
+		if rate_limiter is not None and isinstance(e, (errors.TooManySocialActions, errors.TooManyRegisterAttempts)):
+			rate_limiter.throttled(path)
+
+		if metrics is not None:
+			metrics.record(path, time.perf_counter() - start, size, e)
+
+		if event is not None:
+			event.elapsed = time.perf_counter() - start
+			event.error = e
+			await hooks.fire(client.response_hooks, event)
+		raise
+
+	if rate_limiter is not None:
+		rate_limiter.succeeded(path)
+
+	if metrics is not None:
+		metrics.record(path, time.perf_counter() - start, size)
+
+	if event is not None:
+		event.elapsed = time.perf_counter() - start
+		await hooks.fire(client.response_hooks, event)
+
+	return decoded
@@ -0,0 +1,78 @@
+# SPDX-FileCopyrightText: 2024 DaniElectra
+#
+# SPDX-License-Identifier: MIT
+
+from pou.online import errors
+
+import random
+import requests
+
+class RetryPolicy:
+	"""Decides which failed requests are retried and how long to wait before
+	each retry. Only idempotent (GET) requests are retried, and only when the
+	failure is transient.
+
+	The delays grow exponentially with full jitter. Retries also consume a
+	budget that is refilled by successful requests, so a struggling server
+	isn't flooded with retries from every request that fails.
+
+	Attributes:
+	max_attempts -- the maximum number of attempts of a request
+	base_delay -- the delay before the first retry, in seconds
+	max_delay -- the maximum delay before a retry, in seconds
+	budget -- the maximum number of retries that can be saved up
+	budget_ratio -- the retries earned by each successful request
+	tokens -- the retries currently available
+	retries -- the number of retries made
+	"""
+
+	transient_errors = (
+		errors.FeatureMaintenance,
+		errors.SiteOffline,
+		requests.ConnectionError,
+		requests.Timeout,
+		requests.exceptions.ChunkedEncodingError
+	)
+
+	def __init__(self, max_attempts: int = 4, base_delay: float = 0.5, max_delay: float = 30.0,
+				 budget: float = 10.0, budget_ratio: float = 0.1):
+		self.max_attempts = max_attempts
+		self.base_delay = base_delay
+		self.max_delay = max_delay
+		self.budget = budget
+		self.budget_ratio = budget_ratio
+		self.tokens = budget
+		self.retries = 0
+
+	def is_transient(self, exception: Exception):
+		"""Returns a bool telling if a request that failed with the given
+		exception may succeed when retried.
+		"""
+		if isinstance(exception, errors.InvalidResponse):
+			return exception.status >= 500
+
+		return isinstance(exception, self.transient_errors)
+
+	def should_retry(self, exception: Exception, attempt: int):
+		"""Returns a bool telling if a request should be retried after failing on
+		the given attempt, counting from 0. Takes a retry from the budget if so.
+		"""
+		if attempt + 1 >= self.max_attempts or not self.is_transient(exception):
+			return False
+
+		if self.tokens < 1:
+			return False
+
+		self.tokens -= 1
+		self.retries += 1
+		return True
+
+	def delay(self, attempt: int):
+		"""Returns the number of seconds to wait before retrying a request that
+		failed on the given attempt.
+		"""
+		return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+	def succeeded(self):
+		"""Refills the retry budget after a successful request."""
+		self.tokens = min(self.budget, self.tokens + self.budget_ratio)
@@ -0,0 +1,115 @@
+# SPDX-FileCopyrightText: 2024 DaniElectra
+#
+# SPDX-License-Identifier: MIT
+
+import asyncio
+import hashlib
+
+class SaveManager:
+	"""Coalesces the saves of a client. The save requests made during the
+	debounce window are merged into a single upload of the latest state,
+	and the upload is skipped if the content is the same as the last save
+	acknowledged by the server.
+
+	Attributes:
+	client -- the client used for the requests
+	debounce -- the number of seconds a save request waits for newer ones
+	pending -- the latest save state and min info waiting to be uploaded
+	last_hash -- the hash of the content of the last acknowledged save
+	uploads -- the number of saves uploaded
+	skipped -- the number of saves skipped because nothing changed
+	coalesced -- the number of save requests merged into a later upload
+	error -- the error of the last upload made by the debounce timer, raised
+	by the next flush
+	"""
+
+	def __init__(self, client, debounce: float = 5.0):
+		self.client = client
+		self.debounce = debounce
+		self.pending = None
+		self.last_hash = None
+		self.uploads = 0
+		self.skipped = 0
+		self.coalesced = 0
+		self.error = None
+
+		self.timer = None
+		self.lock = asyncio.Lock()
+
+	def request_save(self, save_state: dict, min_info: dict):
+		"""Schedules a save of the given state at the end of the debounce
+		window, replacing any save still waiting.
+		"""
+		if self.pending is not None:
+			self.coalesced += 1
+
+		self.pending = (save_state, min_info)
+
+		if self.timer is None:
+			self.timer = asyncio.create_task(self._wait())
+
+	async def _wait(self):
+		await asyncio.sleep(self.debounce)
+		self.timer = None
+		try:
+			await self.flush()
+		except Exception as e:
+			# Nobody awaits the timer, so the error is kept for the next flush
+			self.error = e
+
+	async def flush(self):
+		"""Uploads the waiting save right away, unless its content matches the
+		last acknowledged save. Returns a bool telling if the server has the
+		latest state.
+
+		If the upload fails, the save stays waiting, unless a newer one has
+		replaced it in the meantime, so the next flush uploads it again. An
+		error raised by an upload made at the end of the debounce window is
+		raised by the next call to flush or close.
+		"""
+		if self.timer is not None and self.timer is not asyncio.current_task():
+			self.timer.cancel()
+			self.timer = None
+
+		if self.error is not None:
+			error = self.error
+			self.error = None
+			raise error
+
+		async with self.lock:
+			pending = self.pending
+			if pending is None:
+				return True
+
+			# The body is encoded once, both to compare it and to upload it
+			body = self.client.encode_save(*pending)
+			content_hash = hashlib.md5(body).hexdigest()
+			if content_hash == self.last_hash:
+				if self.pending is pending:
+					self.pending = None
+
+				self.skipped += 1
+				return True
+
+			success = await self.client.save_body(body)
+			if success:
+				# Only drop the save once the server has acknowledged it
+				if self.pending is pending:
+					self.pending = None
+
+				self.last_hash = content_hash
+				self.uploads += 1
+
+			return success
+
+	def discard(self):
+		"""Drops the waiting save, if any."""
+		if self.timer is not None:
+			self.timer.cancel()
+			self.timer = None
+
+		self.pending = None
+
+	async def close(self):
+		"""Uploads the waiting save before shutting down."""
+		return await self.flush()
@@ -0,0 +1,601 @@
+# SPDX-FileCopyrightText: 2024 DaniElectra
+#
+# SPDX-License-Identifier: MIT
+
+"""Local stand-in for the Pou game server, for offline testing and
+benchmarking. Run it with python -m pou.online.server.
+"""
+
+import argparse
+import hashlib
+import http.server
+import json
+import logging
+import random
+import secrets
+import threading
+import time
+import urllib.parse
+
+PAGE_SIZE = 20
+PERIODS = ("today", "week", "month", "alltime")
+
+# 1x1 PNG, with the extra character that the client removes at position 10
+_captcha_image = "iVBORw0KGgXoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAAC0lEQVR4nGP4DwQACfsD/fteaysAAAAASUVORK5CYII="
+
+# Extra fields that the client reads from some error types
+_error_fields = {
+	"ClientOutdated": {"diffClient": True},
+	"EmailNotRegistered": {"email": ""},
+	"InvalidArgumentFormat": {"argument": {"name": ""}},
+	"NicknameNotAvailable": {"nickname": ""},
+	"ObjectNotFound": {"resource": {"type": "user", "id": 0}}
+}
+
+def _mix(value: int):
+	"""Deterministic 64-bit integer hash (splitmix64)."""
+	value = (value + 0x9E3779B97F4A7C15) & 0xFFFFFFFFFFFFFFFF
+	value = ((value ^ (value >> 30)) * 0xBF58476D1CE4E5B9) & 0xFFFFFFFFFFFFFFFF
+	value = ((value ^ (value >> 27)) * 0x94D049BB133111EB) & 0xFFFFFFFFFFFFFFFF
+	return value ^ (value >> 31)
+
+def make_save_state(kilobytes: int):
+	"""Builds a save state of roughly the given size once encoded as JSON,
+	shaped like the game state: nested dicts of counters, item lists and
+	strings. Shared by the stand-in server, the load generator and the
+	benchmarks.
+	"""
+	state = {"version": 4, "revision": 267, "coins": 123456, "stats": {}, "items": [], "games": {}}
+	i = 0
+	while len(json.dumps(state)) < kilobytes * 1024:
+		# Encoding the whole state on every item would be quadratic
+		for j in range(32):
+			state["items"].append({"id": i, "count": i % 17, "bought": 1700000000 + i, "tags": ["food", "shop"]})
+			state["stats"]["stat%d" % i] = i * 1.5
+			state["games"]["%d" % (i % 50)] = {"best": i, "played": i * 3, "name": "game %d" % i}
+			i += 1
+
+	return state
+
+class ServerError(Exception):
+	"""Error returned to the client in the format of the Pou server.
+
+	Attributes:
+	type -- the error type, as in errors.pou_errors
+	message -- the error message
+	fields -- extra fields of the error
+	"""
+
+	def __init__(self, type: str, message: str, **fields):
+		self.type = type
+		self.message = message
+		self.fields = fields
+
+class Account:
+	"""Holds a registered account of the stand-in server.
+
+	Attributes:
+	account_id -- the account ID
+	email -- the account email address
+	password -- the MD5 of the account password, or "" if it has none
+	nickname -- the account nickname
+	state -- the last saved game state, as sent by the client
+	min_info -- the last saved min info, as sent by the client
+	"""
+
+	def __init__(self, account_id: int, email: str, password: str, nickname: str, state: str):
+		self.account_id = account_id
+		self.email = email
+		self.password = password
+		self.nickname = nickname
+		self.state = state
+		self.min_info = ""
+
+class SyntheticDataset:
+	"""Deterministic synthetic users for the stand-in server. The users and
+	their lists are computed from their account IDs on every request, so
+	millions of users cost no memory.
+
+	Attributes:
+	user_count -- the number of synthetic users, with IDs from 1
+	max_list_size -- the maximum number of entries of a user list
+	save_state_kb -- the approximate size of the state of new accounts
+	captcha_answer -- the answer accepted for every captcha
+	seed -- the seed of the dataset
+	"""
+
+	base_time = 1700000000
+
+	def __init__(self, user_count: int = 1000000, max_list_size: int = 500, save_state_kb: int = 16, seed: int = 0):
+		self.user_count = user_count
+		self.max_list_size = max_list_size
+		self.save_state_kb = save_state_kb
+		self.captcha_answer = "pou"
+		self.seed = seed
+
+		rng = random.Random(seed)
+		self.min_infos = [""]
+		for i in range(63):
+			min_info = {"sz": rng.choice((0.8, 1.0, 1.2)), "ob": round(rng.random(), 2), "bCo": rng.randrange(40), "eCo": rng.randrange(12)}
+			for key in ("hat", "ouf", "sho", "egl", "wig"):
+				if rng.random() < 0.5:
+					min_info[key] = rng.randrange(1, 100)
+
+			self.min_infos.append(json.dumps(min_info, separators = (",", ":")))
+
+		self._state = None
+
+	def has_user(self, account_id: int):
+		return 1 <= account_id <= self.user_count
+
+	def _hash(self, *values):
+		value = self.seed
+		for item in values:
+			value = _mix(value ^ item)
+
+		return value
+
+	def list_size(self, account_id: int, list_name: str):
+		"""Returns the number of entries of a user list. Sizes are skewed, so
+		most lists are short and a few are long.
+		"""
+		fraction = (self._hash(account_id, len(list_name)) % 10000) / 10000
+		return int(self.max_list_size * fraction ** 3)
+
+	def user(self, account_id: int):
+		"""Returns the response item of a synthetic user."""
+		return {
+			"i": account_id,
+			"n": "user%d" % account_id,
+			"minI": self.min_infos[self._hash(account_id, 1) % len(self.min_infos)],
+			"l": 1,
+			"nL": self.list_size(account_id, "likers")
+		}
+
+	def list_page(self, account_id: int, list_name: str, since: int):
+		"""Returns the users of a page of a user list, the total number of
+		entries and the "next" argument, which is 0 on the last page.
+		"""
+		size = self.list_size(account_id, list_name)
+		offset = self._hash(account_id, 2) % 60
+
+		# Entry k was added 60 seconds after entry k + 1
+		start = 0
+		if since:
+			start = max(0, (self.base_time - offset - since) // 60 + 1)
+
+		end = min(size, start + PAGE_SIZE)
+		items = []
+		for k in range(start, end):
+			other = self._hash(account_id, len(list_name), k) % self.user_count + 1
+			items.append(self.user(other))
+
+		next_since = 0
+		if end < size:
+			next_since = self.base_time - offset - (end - 1) * 60
+
+		return items, size, next_since
+
+	def top_likes(self):
+		"""Returns the items of the most liked users."""
+		items = []
+		for account_id in range(1, min(PAGE_SIZE, self.user_count) + 1):
+			item = self.user(account_id)
+			item["nL"] = self.max_list_size * 100 // account_id
+			items.append(item)
+
+		return items
+
+	def top_scores(self, game_id: int, period: str):
+		"""Returns the items of the best scores of a game during a period."""
+		period_index = PERIODS.index(period) if period in PERIODS else 0
+		items = []
+		for rank in range(PAGE_SIZE):
+			item = self.user(self._hash(game_id, period_index, rank) % self.user_count + 1)
+			item["s"] = 100000 // (rank + 1) + self._hash(game_id, period_index) % 100
+			items.append(item)
+
+		return items
+
+	def initial_state(self):
+		"""Returns the game state of new accounts, of about save_state_kb KB."""
+		if self._state is None:
+			self._state = json.dumps(make_save_state(self.save_state_kb))
+
+		return self._state
+
+class Backend:
+	"""Handles the requests of the stand-in server: the sessions, the
+	registered accounts and the synthetic users.
+
+	Attributes:
+	dataset -- the SyntheticDataset of the server
+	accounts -- the registered accounts, by email address
+	sessions -- the account ID of each session, or None if logged out
+	latency -- the seconds added to every request
+	jitter -- the maximum random seconds added on top of the latency
+	failure_rate -- the fraction of requests that fail on purpose
+	failure_types -- the error types of the failures; "HTTP" makes the
+	server return a non-JSON 502 response
+	daily_limit -- the number of requests allowed per session before
+	TMSA errors, or None for no limit
+	"""
+
+	def __init__(self, dataset: SyntheticDataset = None):
+		self.dataset = dataset or SyntheticDataset()
+		self.accounts = {}
+		self.accounts_by_id = {}
+		self.sessions = {}
+		self.requests = {}
+		self.captchas = set()
+		self.latency = 0.0
+		self.jitter = 0.0
+		self.failure_rate = 0.0
+		self.failure_types = ["SiteOffline"]
+		self.daily_limit = None
+		self.lock = threading.Lock()
+
+		self.next_account_id = self.dataset.user_count + 1
+
+		self.routes = {
+			"/ajax/site/check_email": self.check_email,
+			"/ajax/site/top_likes": self.top_likes,
+			"/ajax/site/register": self.register,
+			"/ajax/site/top_scores": self.top_scores,
+			"/ajax/site/login": self.login,
+			"/ajax/account/save": self.save,
+			"/ajax/account/logout": self.logout,
+			"/ajax/account/delete": self.delete,
+			"/ajax/account/info": self.account_info,
+			"/ajax/account/check_password": self.check_password,
+			"/ajax/user/favorites": self.favorites,
+			"/ajax/user/likers": self.likers,
+			"/ajax/user/visitors": self.visitors
+		}
+
+	def add_account(self, email: str, password: str, nickname: str = None):
+		"""Registers an account with the given password. Returns the Account."""
+		with self.lock:
+			account_id = self.next_account_id
+			self.next_account_id += 1
+
+		if nickname is None:
+			nickname = "pou%d" % account_id
+
+		password_hash = hashlib.md5(password.encode("utf-8")).hexdigest() if password else ""
+		account = Account(account_id, email, password_hash, nickname, self.dataset.initial_state())
+		self.accounts[email] = account
+		self.accounts_by_id[account_id] = account
+		return account
+
+	def new_session(self):
+		"""Creates an anonymous session. Returns its token."""
+		token = secrets.token_hex(16)
+		self.sessions[token] = None
+		return token
+
+	def handle(self, path: str, params: dict, body: bytes, session: str):
+		"""Handles a request and returns the response as a dict. Errors are
+		raised as ServerError.
+		"""
+		if self.latency or self.jitter:
+			time.sleep(self.latency + random.random() * self.jitter)
+
+		if self.failure_rate and random.random() < self.failure_rate:
+			failure = random.choice(self.failure_types)
+			raise ServerError(failure, "Injected failure", **_error_fields.get(failure, {}))
+
+		if self.daily_limit is not None:
+			with self.lock:
+				count = self.requests.get(session, 0) + 1
+				self.requests[session] = count
+
+			if count > self.daily_limit:
+				raise ServerError("TMSA", "Too many social actions for today")
+
+		route = self.routes.get(path)
+		if route is None:
+			raise ServerError("InvalidRequest", "Invalid request")
+
+		return route(params, body, session)
+
+	def _account(self, session: str):
+		account_id = self.sessions.get(session)
+		account = self.accounts_by_id.get(account_id)
+		if account is None:
+			raise ServerError("UserNotLoggedIn", "User not logged in")
+
+		return account
+
+	def _confirm(self, params: dict, message: bytes):
+		if params.get("c") != hashlib.md5(message).hexdigest():
+			raise ServerError("InvalidRequest", "Invalid confirmation")
+
+	def _captcha(self):
+		captcha_id = secrets.token_hex(8)
+		self.captchas.add(captcha_id)
+		return {"capId": captcha_id, "capLen": len(self.dataset.captcha_answer), "capImg": _captcha_image}
+
+	def _user_list(self, params: dict, list_name: str):
+		try:
+			account_id = int(params["id"])
+			since = int(params.get("s", 0))
+		except (KeyError, ValueError):
+			raise ServerError("InvalidArgumentFormat", "Invalid argument", argument = {"name": "id"})
+
+		if not self.dataset.has_user(account_id) and account_id not in self.accounts_by_id:
+			raise ServerError("ObjectNotFound", "User not found", resource = {"type": "user", "id": account_id})
+
+		if not self.dataset.has_user(account_id):
+			return {"ok": True, "items": [], "count": 0}, 0
+
+		items, size, next_since = self.dataset.list_page(account_id, list_name, since)
+		response = {"ok": True, "items": items, "count": size}
+		if next_since:
+			response["next"] = next_since
+
+		return response, size
+
+	def check_email(self, params: dict, body: bytes, session: str):
+		if params.get("e") in self.accounts:
+			return {"registered": True}
+
+		response = {"registered": False}
+		response.update(self._captcha())
+		return response
+
+	def top_likes(self, params: dict, body: bytes, session: str):
+		return {"ok": True, "items": self.dataset.top_likes()}
+
+	def register(self, params: dict, body: bytes, session: str):
+		email = params.get("e", "")
+		if email in self.accounts:
+			raise ServerError("EmailAlreadyRegistered", "Email already registered")
+
+		if params.get("cI") not in self.captchas or params.get("cA") != self.dataset.captcha_answer:
+			response = {"error": {"type": "ICap", "message": "Incorrect captcha"}}
+			response.update(self._captcha())
+			return response
+
+		self.captchas.discard(params["cI"])
+		account = self.add_account(email, "")
+		self.sessions[session] = account.account_id
+		return {"success": True, "nickname": account.nickname, "i": account.account_id, "n": account.nickname}
+
+	def top_scores(self, params: dict, body: bytes, session: str):
+		try:
+			game_id = int(params.get("g", 0))
+		except ValueError:
+			raise ServerError("InvalidArgumentFormat", "Invalid argument", argument = {"name": "g"})
+
+		period = params.get("d", "alltime")
+		return {"ok": True, "items": self.dataset.top_scores(game_id, period)}
+
+	def login(self, params: dict, body: bytes, session: str):
+		email = params.get("e", "")
+		account = self.accounts.get(email)
+		if account is None:
+			raise ServerError("EmailNotRegistered", "Email not registered", email = email)
+
+		if account.password != params.get("p"):
+			raise ServerError("IncorrectUserCredentials", "Incorrect credentials")
+
+		self.sessions[session] = account.account_id
+		return {
+			"success": True,
+			"i": account.account_id,
+			"n": account.nickname,
+			"t": "",
+			"hP": bool(account.password),
+			"nF": 0,
+			"nL": 0,
+			"state": account.state,
+			"version": 4,
+			"revision": 267
+		}
+
+	def save(self, params: dict, body: bytes, session: str):
+		account = self._account(session)
+		self._confirm(params, b"p@v_" + body + session.encode("utf-8"))
+
+		try:
+			payload = json.loads(body)
+			state = payload["state"]
+			min_info = payload["minInfo"]
+		except (ValueError, KeyError, TypeError):
+			raise ServerError("InvalidArgumentFormat", "Invalid argument", argument = {"name": "state"})
+
+		account.state = state
+		account.min_info = min_info
+		return {"success": True}
+
+	def logout(self, params: dict, body: bytes, session: str):
+		self._account(session)
+		self.sessions[session] = None
+		return {"success": True}
+
+	def delete(self, params: dict, body: bytes, session: str):
+		account = self._account(session)
+		self._confirm(params, b"p@v_" + session.encode("utf-8"))
+
+		del self.accounts[account.email]
+		del self.accounts_by_id[account.account_id]
+		self.sessions[session] = None
+		return {"success": True}
+
+	def account_info(self, params: dict, body: bytes, session: str):
+		account = self._account(session)
+		return {
+			"ok": True,
+			"i": account.account_id,
+			"e": account.email,
+			"hP": bool(account.password),
+			"n": account.nickname,
+			"t": "",
+			"l": 1,
+			"nF": 0,
+			"nL": 0
+		}
+
+	def check_password(self, params: dict, body: bytes, session: str):
+		account = self._account(session)
+		return {"ok": account.password == params.get("p")}
+
+	def favorites(self, params: dict, body: bytes, session: str):
+		return self._user_list(params, "favorites")[0]
+
+	def likers(self, params: dict, body: bytes, session: str):
+		return self._user_list(params, "likers")[0]
+
+	def visitors(self, params: dict, body: bytes, session: str):
+		response = self._user_list(params, "visitors")[0]
+		response.pop("count", None)
+		return response
+
+class _RequestHandler(http.server.BaseHTTPRequestHandler):
+	protocol_version = "HTTP/1.1"
+
+	# The headers and the body are separate writes, which Nagle's algorithm
+	# would delay on kept-alive connections
+	disable_nagle_algorithm = True
+
+	def log_message(self, format, *args):
+		self.server.logger.debug(format, *args)
+
+	def _handle(self):
+		url = urllib.parse.urlsplit(self.path)
+		params = dict(urllib.parse.parse_qsl(url.query))
+
+		length = int(self.headers.get("Content-Length") or 0)
+		body = self.rfile.read(length) if length else b""
+
+		backend = self.server.backend
+
+		cookie = None
+		session = None
+		for item in (self.headers.get("Cookie") or "").split(";"):
+			name, _, value = item.strip().partition("=")
+			if name == "unn_session" and value in backend.sessions:
+				session = value
+
+		if session is None:
+			session = backend.new_session()
+			cookie = "unn_session=%s; Path=/" % session
+
+		status = 200
+		try:
+			response = backend.handle(url.path, params, body, session)
+			content = json.dumps(response, separators = (",", ":")).encode("utf-8")
+		except ServerError as e:
+			if e.type == "HTTP":
+				status = 502
+				content = b"<html><body>502 Bad Gateway</body></html>"
+			else:
+				error = {"type": e.type, "message": e.message}
+				error.update(e.fields)
+				content = json.dumps({"error": error}).encode("utf-8")
+
+		self.send_response(status)
+		self.send_header("Content-Type", "application/json" if status == 200 else "text/html")
+		self.send_header("Content-Length", str(len(content)))
+		if cookie is not None:
+			self.send_header("Set-Cookie", cookie)
+		self.end_headers()
+		self.wfile.write(content)
+
+	do_GET = _handle
+	do_POST = _handle
+
+class PouServer:
+	"""Local HTTP stand-in for the Pou game server. It implements every
+	endpoint of PouClient, the "unn_session" cookie, the "c" confirmation
+	hashes, paginated user lists and the documented errors, on top of a
+	SyntheticDataset. Latency and failures can be injected through the
+	backend.
+
+	Attributes:
+	ip -- the IP the server listens on
+	port -- the port the server listens on, 0 to pick a free one
+	backend -- the Backend that handles the requests
+	logger -- the logger used for the server
+	server -- the HTTP server, once started
+	"""
+
+	def __init__(self, dataset: SyntheticDataset = None, ip: str = "127.0.0.1", port: int = 0):
+		self.ip = ip
+		self.port = port
+		self.backend = Backend(dataset)
+		self.logger = logging.getLogger("Pou server")
+
+		self.server = None
+		self.thread = None
+
+	@property
+	def host(self):
+		"""The URL to use as the host of a PouClient."""
+		return "http://%s:%d" % (self.ip, self.port)
+
+	def _bind(self):
+		self.server = http.server.ThreadingHTTPServer((self.ip, self.port), _RequestHandler)
+		self.server.daemon_threads = True
+		self.server.backend = self.backend
+		self.server.logger = self.logger
+		self.port = self.server.server_address[1]
+
+	def start(self):
+		"""Starts the server on a background thread and returns right away."""
+		self._bind()
+		self.thread = threading.Thread(target = self.server.serve_forever, daemon = True)
+		self.thread.start()
+		self.logger.info("Listening on %s", self.host)
+
+	def serve_forever(self):
+		"""Runs the server on the current thread until it's shut down."""
+		self._bind()
+		self.logger.info("Listening on %s", self.host)
+		try:
+			self.server.serve_forever()
+		except KeyboardInterrupt:
+			self.logger.info("Caught keyboard interrupt, exiting")
+		finally:
+			self.server.server_close()
+
+	def shutdown(self):
+		"""Shuts down the server."""
+		self.server.shutdown()
+		self.server.server_close()
+
+def main():
+	parser = argparse.ArgumentParser(description = "Local stand-in for the Pou game server")
+	parser.add_argument("--ip", default = "127.0.0.1")
+	parser.add_argument("--port", type = int, default = 8080)
+	parser.add_argument("--users", type = int, default = 1000000, help = "number of synthetic users")
+	parser.add_argument("--max-list-size", type = int, default = 500, help = "maximum entries of a user list")
+	parser.add_argument("--state-kb", type = int, default = 16, help = "size of the state of new accounts")
+	parser.add_argument("--latency", type = float, default = 0.0, help = "seconds added to every request")
+	parser.add_argument("--jitter", type = float, default = 0.0, help = "maximum random seconds added to the latency")
+	parser.add_argument("--failure-rate", type = float, default = 0.0, help = "fraction of requests that fail")
+	parser.add_argument("--failure-type", action = "append", help = "error type of the failures, or HTTP")
+	parser.add_argument("--daily-limit", type = int, help = "requests per session before TMSA errors")
+	parser.add_argument("--account", action = "append", default = [], metavar = "EMAIL:PASSWORD", help = "account to register")
+	args = parser.parse_args()
+
+	logging.basicConfig(level = logging.INFO, format = "[%(asctime)s] [%(levelname)s] %(name)s: %(message)s")
+
+	dataset = SyntheticDataset(args.users, args.max_list_size, args.state_kb)
+	server = PouServer(dataset, args.ip, args.port)
+	server.backend.latency = args.latency
+	server.backend.jitter = args.jitter
+	server.backend.failure_rate = args.failure_rate
+	server.backend.daily_limit = args.daily_limit
+	if args.failure_type:
+		server.backend.failure_types = args.failure_type
+
+	for account in args.account:
+		email, _, password = account.partition(":")
+		server.backend.add_account(email, password)
+
+	server.serve_forever()
+
+if __name__ == "__main__":
+	main()
@@ -2,28 +2,34 @@
 #
 # SPDX-License-Identifier: MIT
 
-from pou.online import common
+from pou.online import codec, common
 
-import json
-
-class UserScoreInfo:
+class UserScoreInfo(common.LazyMinInfo):
 	"""Holds information about the user's relationship with the client's
 	account and the score it has on a certain game.
 
 	Attributes:
 	account_id -- the account ID of the user
 	nickname -- the user nickname
-	min_info -- the information about the Pou of the user
+	min_info -- the information about the Pou of the user, decoded from
+	min_info_raw on first access
+	min_info_raw -- the undecoded information about the Pou of the user
 	l -- unknown argument
 	likers_count -- the number of likers the user has
 	score -- the score of the user
 	i_like -- if the account of the client likes this user
 	likes_me -- if the user likes the client's account
 	"""
+	__slots__ = (
+		"account_id", "nickname", "min_info_raw", "_min_info", "l",
+		"likers_count", "i_like", "likes_me", "score"
+	)
+
 	def __init__(self):
 		self.account_id = 0
 		self.nickname = ""
-		self.min_info = {}
+		self.min_info_raw = ""
+		self._min_info = None
 		self.l = 0
 		self.likers_count = 0
 		self.i_like = False
@@ -31,15 +37,23 @@ class UserScoreInfo:
 		self.score = 0
 
 	@staticmethod
-	def from_response(response: dict):
-		"""Fills the attributes of this class from a server response."""
+	def from_response(response: dict, keep_min_info: bool = True, interner: common.MinInfoInterner = None):
+		"""Fills the attributes of this class from a server response. The
+		information about the Pou is decoded when it's first accessed, and is
+		dropped if keep_min_info is False. If an intern table is given, the
+		information is taken from it instead, shared with the other users with
+		the same Pou aspect.
+		"""
 
 		user_score_info = UserScoreInfo()
 		user_score_info.account_id = int(response["i"])
 		user_score_info.nickname = response["n"]
 
-		if response["minI"]:
-			user_score_info.min_info = common.PouMinInfo.from_response(json.loads(response["minI"]))
+		if keep_min_info:
+			if interner is not None and response["minI"]:
+				user_score_info.min_info_raw, user_score_info._min_info = interner.intern(response["minI"])
+			else:
+				user_score_info.min_info_raw = response["minI"]
 
 		user_score_info.l = int(response["l"])
 		user_score_info.likers_count = int(response["nL"])
@@ -54,6 +68,19 @@ class UserScoreInfo:
 
 		return user_score_info
 
+	def to_dict(self):
+		"""Returns the attributes of this class as a dict."""
+		return {
+			"account_id": self.account_id,
+			"nickname": self.nickname,
+			"min_info": common.min_info_to_dict(self.min_info),
+			"l": self.l,
+			"likers_count": self.likers_count,
+			"score": self.score,
+			"i_like": self.i_like,
+			"likes_me": self.likes_me
+		}
+
 class Captcha:
 	"""Stores all the information about the server captcha upon registering a
 	new account.
@@ -64,6 +91,8 @@ class Captcha:
 	captcha_img -- the captcha stored as a base64 PNG
 	"""
 
+	__slots__ = ("captcha_id", "captcha_length", "captcha_img")
+
 	def __init__(self):
 		self.captcha_id = ""
 		self.captcha_length = 0
@@ -91,6 +120,8 @@ class RegistrationInfo:
 	account_id -- the account ID
 	n -- same as nickname
 	"""
+	__slots__ = ("nickname", "account_id", "n")
+
 	def __init__(self):
 		self.nickname = ""
 		self.account_id = 0
@@ -123,6 +154,11 @@ class UserLogin:
 	revision -- the save data revision
 	"""
 
+	__slots__ = (
+		"account_id", "nickname", "t", "has_password", "favorites_count",
+		"likers_count", "save_state", "version", "revision"
+	)
+
 	def __init__(self):
 		self.account_id = 0
 		self.nickname = ""
@@ -145,7 +181,7 @@ class UserLogin:
 		user_login.has_password = response["hP"]
 		user_login.favorites_count = int(response["nF"])
 		user_login.likers_count = int(response["nL"])
-		user_login.save_state = json.loads(response["state"])
+		user_login.save_state = codec.loads(response["state"])
 		user_login.version = response["version"]
 		user_login.revision = response["revision"]
 
@@ -0,0 +1,238 @@
+# SPDX-FileCopyrightText: 2024 DaniElectra
+#
+# SPDX-License-Identifier: MIT
+
+from pou.online import user
+
+import asyncio
+import concurrent.futures
+import sqlite3
+import time
+
+_schema = """
+CREATE TABLE IF NOT EXISTS users (
+	account_id INTEGER PRIMARY KEY,
+	nickname TEXT NOT NULL,
+	min_info TEXT NOT NULL,
+	l INTEGER NOT NULL,
+	likers_count INTEGER NOT NULL,
+	updated INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS users_likers_count ON users (likers_count);
+
+CREATE TABLE IF NOT EXISTS likes (
+	liker INTEGER NOT NULL,
+	liked INTEGER NOT NULL,
+	updated INTEGER NOT NULL,
+	PRIMARY KEY (liker, liked)
+);
+CREATE INDEX IF NOT EXISTS likes_liked ON likes (liked);
+
+CREATE TABLE IF NOT EXISTS visits (
+	host INTEGER NOT NULL,
+	visitor INTEGER NOT NULL,
+	seen INTEGER NOT NULL,
+	PRIMARY KEY (host, visitor)
+);
+CREATE INDEX IF NOT EXISTS visits_visitor ON visits (visitor);
+"""
+
+_upsert_user = """
+INSERT INTO users (account_id, nickname, min_info, l, likers_count, updated)
+VALUES (?, ?, ?, ?, ?, ?)
+ON CONFLICT (account_id) DO UPDATE SET
+	nickname = excluded.nickname,
+	min_info = excluded.min_info,
+	l = excluded.l,
+	likers_count = excluded.likers_count,
+	updated = excluded.updated
+"""
+
+_upsert_like = """
+INSERT INTO likes (liker, liked, updated) VALUES (?, ?, ?)
+ON CONFLICT (liker, liked) DO UPDATE SET updated = excluded.updated
+"""
+
+_upsert_visit = """
+INSERT INTO visits (host, visitor, seen) VALUES (?, ?, ?)
+ON CONFLICT (host, visitor) DO UPDATE SET seen = excluded.seen
+"""
+
+def _user_row(user_info: user.UserInfo, now: int):
+	return (user_info.account_id, user_info.nickname, user_info.min_info_raw, user_info.l, user_info.likers_count, now)
+
+def _user_from_row(row: tuple):
+	user_info = user.UserInfo()
+	user_info.account_id, user_info.nickname, user_info.min_info_raw, user_info.l, user_info.likers_count = row
+	return user_info
+
+class UserStore:
+	"""Local SQLite store of the users, the likes between them and the
+	visits they made. Storing a user or an edge that already exists updates
+	it in place.
+
+	Attributes:
+	path -- the path of the database
+	connection -- the connection to the database
+	"""
+
+	def __init__(self, path: str):
+		self.path = path
+		self.connection = sqlite3.connect(path, check_same_thread = False)
+		self.connection.execute("PRAGMA journal_mode = WAL")
+		self.connection.execute("PRAGMA synchronous = NORMAL")
+		self.connection.executescript(_schema)
+
+	def close(self):
+		"""Closes the database."""
+		self.connection.close()
+
+	def add_page(self, list_name: str, account_id: int, users: list, now: int = None):
+		"""Stores the users of a page of the "favorites", "likers" or "visitors"
+		list of an account, and the edges between the account and them, in a
+		single transaction.
+		"""
+		self.apply([(list_name, account_id, users)], now)
+
+	def apply(self, pages: list, now: int = None):
+		"""Stores several pages given as (list name, account ID, users) in a
+		single transaction. A list name of None stores only the users.
+		"""
+		if now is None:
+			now = int(time.time())
+
+		users = []
+		likes = []
+		visits = []
+		for list_name, account_id, page_users in pages:
+			users.extend(_user_row(user_info, now) for user_info in page_users)
+
+			if list_name == "favorites":
+				likes.extend((account_id, user_info.account_id, now) for user_info in page_users)
+			elif list_name == "likers":
+				likes.extend((user_info.account_id, account_id, now) for user_info in page_users)
+			elif list_name == "visitors":
+				visits.extend((account_id, user_info.account_id, now) for user_info in page_users)
+
+		with self.connection:
+			self.connection.executemany(_upsert_user, users)
+			self.connection.executemany(_upsert_like, likes)
+			self.connection.executemany(_upsert_visit, visits)
+
+	def get_user(self, account_id: int):
+		"""Returns the stored UserInfo of an account, or None if it isn't
+		stored.
+		"""
+		cursor = self.connection.execute(
+			"SELECT account_id, nickname, min_info, l, likers_count FROM users WHERE account_id = ?", (account_id,)
+		)
+		row = cursor.fetchone()
+		if row is not None:
+			return _user_from_row(row)
+
+	def top_by_likers(self, count: int = 100):
+		"""Returns the UserInfo of the stored users with the most likers."""
+		cursor = self.connection.execute(
+			"SELECT account_id, nickname, min_info, l, likers_count FROM users ORDER BY likers_count DESC LIMIT ?", (count,)
+		)
+		return [_user_from_row(row) for row in cursor]
+
+	def favorites_of(self, account_id: int):
+		"""Returns the IDs of the stored accounts that an account likes."""
+		cursor = self.connection.execute("SELECT liked FROM likes WHERE liker = ?", (account_id,))
+		return [row[0] for row in cursor]
+
+	def likers_of(self, account_id: int):
+		"""Returns the IDs of the stored accounts that like an account."""
+		cursor = self.connection.execute("SELECT liker FROM likes WHERE liked = ?", (account_id,))
+		return [row[0] for row in cursor]
+
+	def visitors_of(self, account_id: int):
+		"""Returns the IDs of the stored accounts that visited an account."""
+		cursor = self.connection.execute("SELECT visitor FROM visits WHERE host = ?", (account_id,))
+		return [row[0] for row in cursor]
+
+	def user_count(self):
+		"""Returns the number of stored users."""
+		return self.connection.execute("SELECT COUNT(*) FROM users").fetchone()[0]
+
+_close = object()
+
+class StoreWriter:
+	"""Single writer task that feeds a UserStore from asynchronous code. The
+	pages are queued, grouped into batches of up to batch_size pages and
+	written in one transaction each, on a dedicated thread so the event loop
+	is never blocked.
+
+	Attributes:
+	store -- the store written to
+	batch_size -- the maximum number of pages written per transaction
+	queue -- the pages waiting to be written
+	error -- the exception raised by the store, if writing failed. Once set,
+	the pages still queued are dropped and every later call raises it
+	"""
+
+	def __init__(self, store: UserStore, batch_size: int = 100, max_pending: int = 10000):
+		self.store = store
+		self.batch_size = batch_size
+		self.queue = asyncio.Queue(maxsize = max_pending)
+		self.executor = concurrent.futures.ThreadPoolExecutor(max_workers = 1, thread_name_prefix = "pou-store")
+		self.task = None
+		self.error = None
+
+	def start(self):
+		"""Starts the writer task."""
+		self.task = asyncio.create_task(self._run())
+
+	async def add_page(self, list_name: str, account_id: int, users: list):
+		"""Queues a page of the "favorites", "likers" or "visitors" list of an
+		account. Waits if too many pages are pending. Raises the error of the
+		store if writing has failed.
+		"""
+		await self._put((list_name, account_id, users))
+
+	async def add_users(self, users: list):
+		"""Queues users to be stored without any edge."""
+		await self._put((None, 0, users))
+
+	async def close(self):
+		"""Writes the pending pages and stops the writer task. Raises the error
+		of the store if writing has failed.
+		"""
+		await self.queue.put(_close)
+		await self.task
+		self.executor.shutdown()
+
+		if self.error is not None:
+			raise self.error
+
+	async def _put(self, item):
+		if self.error is not None:
+			raise self.error
+
+		await self.queue.put(item)
+
+		# The writer may have failed while this call was waiting
+		if self.error is not None:
+			raise self.error
+
+	async def _run(self):
+		loop = asyncio.get_running_loop()
+
+		closing = False
+		while not closing:
+			pages = [await self.queue.get()]
+			while len(pages) < self.batch_size and not self.queue.empty():
+				pages.append(self.queue.get_nowait())
+
+			if pages[-1] is _close:
+				pages.pop()
+				closing = True
+
+			# After a failure the queue is still drained, so that no producer
+			# waits forever for room
+			if pages and self.error is None:
+				try:
+					await loop.run_in_executor(self.executor, self.store.apply, pages)
+				except Exception as e:
+					self.error = e
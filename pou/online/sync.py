@@ -0,0 +1,184 @@
+# SPDX-FileCopyrightText: 2024 DaniElectra
+#
+# SPDX-License-Identifier: MIT
+
+import asyncio
+import json
+import os
+import time
+
+class CursorStore:
+	"""Stores, for every account and user list, the newest entries seen on
+	the last synchronization and the "next" timestamp that follows them, in
+	a JSON file.
+
+	Attributes:
+	path -- the path of the file, or None to keep the cursors in memory
+	cursors -- the cursor of each list, by "account_id:list_name"
+	"""
+
+	def __init__(self, path: str = None):
+		self.path = path
+		self.cursors = {}
+
+		if path and os.path.exists(path):
+			with open(path, "r") as f:
+				self.cursors = json.load(f)
+
+	def get(self, account_id: int, list_name: str):
+		"""Returns the cursor of a list, or None if it was never synchronized."""
+		return self.cursors.get("%d:%s" % (account_id, list_name))
+
+	def set(self, account_id: int, list_name: str, head: list, next_since: int = 0):
+		"""Sets the newest account IDs seen on a list, and the "next" argument
+		of the page where they end, which is 0 if the list ended there.
+		"""
+		self.cursors["%d:%s" % (account_id, list_name)] = {"head": head, "next": next_since, "synced": int(time.time())}
+
+	def save(self):
+		"""Writes the cursors to the file, replacing it atomically."""
+		if not self.path:
+			return
+
+		temp_path = self.path + ".tmp"
+		with open(temp_path, "w") as f:
+			json.dump(self.cursors, f, separators = (",", ":"))
+
+		os.replace(temp_path, self.path)
+
+def _unmoved_start(items: list, head: list):
+	"""Returns the position of the first entry of the old head that is still
+	in its place, or None if none of them is on the items.
+
+	The entries of the old head that stayed in place are the last ones of
+	the head found on the items, in the same order as before. The entries
+	that were liked or visited again moved to the top, above them.
+	"""
+	old_index = {account_id: index for index, account_id in enumerate(head)}
+
+	end = len(items) - 1
+	while end >= 0 and items[end].account_id not in old_index:
+		end -= 1
+
+	if end < 0:
+		return None
+
+	start = end
+	while start > 0:
+		index = old_index.get(items[start - 1].account_id)
+		if index is None or index >= old_index[items[start].account_id]:
+			break
+
+		start -= 1
+
+	return start
+
+class Synchronizer:
+	"""Keeps the favorites, likers and visitors of tracked accounts up to
+	date by fetching only the entries added since the last synchronization.
+
+	The lists are ordered from the newest entry. The cursor of a list holds
+	its newest entries and the "next" timestamp of the page where they end,
+	so each synchronization walks the pages from the start until it passes
+	that timestamp, and the entries above the old head are the new ones.
+	An entry that was already known but was liked or visited again moves
+	to the top, so it's returned as new too, and the walk never stops at
+	it. A list that was never synchronized is walked completely.
+
+	Attributes:
+	client -- the client used for the requests
+	cursors -- the CursorStore with the newest entries of each list
+	head_size -- the number of newest entries remembered per list, so that
+	removing a few of them doesn't force a full walk
+	writer -- the StoreWriter that receives the new entries, or None
+	"""
+
+	def __init__(self, client, cursors: CursorStore = None, head_size: int = 20):
+		self.client = client
+		self.cursors = cursors if cursors is not None else CursorStore()
+		self.head_size = head_size
+		self.writer = None
+
+	async def sync(self, account_id: int, list_name: str):
+		"""Synchronizes the "favorites", "likers" or "visitors" list of an
+		account. Returns the UserInfo of the entries added since the last
+		synchronization, newest first, or None if a page couldn't be fetched,
+		in which case the cursor is left as it was.
+		"""
+		fetch = getattr(self.client, list_name)
+
+		cursor = self.cursors.get(account_id, list_name)
+
+		items = []
+		head_next = 0
+		since = 0
+		while True:
+			page = await fetch(account_id, since)
+			if page is None:
+				return None
+
+			head_filled = len(items) >= self.head_size
+			items.extend(page.items)
+			if not head_filled and len(items) >= self.head_size:
+				head_next = page.next
+
+			if not page.next or not page.items:
+				break
+
+			# The rest of the list is older than the old head
+			if cursor is not None and len(items) >= self.head_size and page.next < cursor.get("next", 0):
+				break
+
+			since = page.next
+
+		new_users = items
+		if cursor is not None:
+			start = _unmoved_start(items, cursor["head"])
+			if start is not None:
+				new_users = items[:start]
+
+		if self.writer is not None and new_users:
+			await self.writer.add_page(list_name, account_id, new_users)
+
+		head = [user_info.account_id for user_info in items[:self.head_size]]
+		self.cursors.set(account_id, list_name, head, head_next)
+		return new_users
+
+	async def sync_all(self, account_ids: list, lists: tuple = ("favorites", "likers", "visitors"), concurrency: int = 8):
+		"""Synchronizes the given lists of many accounts, with up to concurrency
+		lists synchronized at the same time. Yields a tuple with the account
+		ID, the list name and the new entries of each list, or None if it
+		couldn't be fetched, as soon as it's done, and saves the cursors at
+		the end.
+		"""
+		jobs = asyncio.Queue()
+		for account_id in account_ids:
+			for list_name in lists:
+				jobs.put_nowait((account_id, list_name))
+
+		results = asyncio.Queue(maxsize = concurrency)
+
+		async def worker():
+			while not jobs.empty():
+				account_id, list_name = jobs.get_nowait()
+				try:
+					new_users = await self.sync(account_id, list_name)
+				except Exception as e:
+					await results.put(e)
+					return
+
+				await results.put((account_id, list_name, new_users))
+
+		workers = [asyncio.create_task(worker()) for i in range(concurrency)]
+		try:
+			for i in range(len(account_ids) * len(lists)):
+				result = await results.get()
+				if isinstance(result, Exception):
+					raise result
+
+				yield result
+		finally:
+			for task in workers:
+				task.cancel()
+
+			self.cursors.save()
@@ -0,0 +1,73 @@
+# SPDX-FileCopyrightText: 2024 DaniElectra
+#
+# SPDX-License-Identifier: MIT
+
+import asyncio
+import concurrent.futures
+import functools
+import requests
+import requests.adapters
+
+class Response:
+	"""Holds the raw HTTP response returned by a transport.
+
+	Attributes:
+	status -- the HTTP status code
+	content -- the response body
+	headers -- the response headers
+	"""
+	def __init__(self, status: int, content: bytes, headers: dict = None):
+		self.status = status
+		self.content = content
+		self.headers = headers or {}
+
+class RequestsTransport:
+	"""Transport that sends the requests of a requests.Session from a bounded
+	thread pool, so that many requests can be awaited at the same time
+	without blocking the event loop.
+	The session keeps handling the cookies, so the "unn_session" cookie set
+	by the server is shared by every request of the client.
+
+	This is not a native asyncio client: the package only depends on
+	requests, so each request still blocks a worker thread. At most
+	max_connections requests are in flight at once, and the others wait
+	for a free thread. The requests.Session is shared by the worker threads,
+	which is safe for the connection pool and the cookie jar as used here,
+	but the session shouldn't be reconfigured while requests are in flight.
+	Any object with the same send and close methods can replace this
+	transport.
+
+	Attributes:
+	session -- the session used for the requests
+	max_connections -- the maximum number of simultaneous requests
+	timeout -- the seconds to wait for the connection and for each read
+	before raising requests.Timeout, so a stalled request doesn't hold a
+	worker thread forever, or None to wait forever
+	executor -- the thread pool that runs the requests
+	"""
+	def __init__(self, session: requests.Session, max_connections: int = 10, timeout: float = 30.0):
+		self.session = session
+		self.max_connections = max_connections
+		self.timeout = timeout
+
+		# Block instead of opening throwaway connections when the pool is full
+		adapter = requests.adapters.HTTPAdapter(pool_maxsize = max_connections, pool_block = True)
+		self.session.mount("http://", adapter)
+		self.session.mount("https://", adapter)
+
+		self.executor = concurrent.futures.ThreadPoolExecutor(max_workers = max_connections, thread_name_prefix = "pou-transport")
+
+	async def send(self, method: str, url: str, params: dict = None, data: bytes = None, headers: dict = None):
+		"""Sends a request to the server and returns its Response once it is
+		received.
+		"""
+		loop = asyncio.get_running_loop()
+		request = functools.partial(self.session.request, method = method, url = url, params = params, data = data, headers = headers, timeout = self.timeout)
+		response = await loop.run_in_executor(self.executor, request)
+
+		return Response(response.status_code, response.content, dict(response.headers))
+
+	def close(self):
+		"""Closes the connections and the thread pool of the transport."""
+		self.executor.shutdown(wait = False)
+		self.session.close()
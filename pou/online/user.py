@@ -4,40 +4,54 @@
 
 from pou.online import common
 
-import json
-
-class UserInfo:
+class UserInfo(common.LazyMinInfo):
 	"""Holds information about the user's relationship with the client's
 	account and the number of likes it has.
 
 	Attributes:
 	account_id -- the account ID of the user
 	nickname -- the user nickname
-	min_info -- the information about the Pou of the user
+	min_info -- the information about the Pou of the user, decoded from
+	min_info_raw on first access
+	min_info_raw -- the undecoded information about the Pou of the user
 	l -- unknown argument
 	likers_count -- the number of likers the user has
 	i_like -- if the account of the client likes this user
 	likes_me -- if the user likes the client's account
 	"""
+	__slots__ = (
+		"account_id", "nickname", "min_info_raw", "_min_info", "l",
+		"likers_count", "i_like", "likes_me"
+	)
+
 	def __init__(self):
 		self.account_id = 0
 		self.nickname = ""
-		self.min_info = {}
+		self.min_info_raw = ""
+		self._min_info = None
 		self.l = 0
 		self.likers_count = 0
 		self.i_like = False
 		self.likes_me = False
 
 	@staticmethod
-	def from_response(response: dict):
-		"""Fills the attributes of this class from a server response."""
+	def from_response(response: dict, keep_min_info: bool = True, interner: common.MinInfoInterner = None):
+		"""Fills the attributes of this class from a server response. The
+		information about the Pou is decoded when it's first accessed, and is
+		dropped if keep_min_info is False. If an intern table is given, the
+		information is taken from it instead, shared with the other users with
+		the same Pou aspect.
+		"""
 
 		user_info = UserInfo()
 		user_info.account_id = int(response["i"])
 		user_info.nickname = response["n"]
 
-		if response["minI"]:
-			user_info.min_info = common.PouMinInfo.from_response(json.loads(response["minI"]))
+		if keep_min_info:
+			if interner is not None and response["minI"]:
+				user_info.min_info_raw, user_info._min_info = interner.intern(response["minI"])
+			else:
+				user_info.min_info_raw = response["minI"]
 
 		user_info.l = int(response["l"])
 		user_info.likers_count = int(response["nL"])
@@ -51,6 +65,18 @@ class UserInfo:
 
 		return user_info
 
+	def to_dict(self):
+		"""Returns the attributes of this class as a dict."""
+		return {
+			"account_id": self.account_id,
+			"nickname": self.nickname,
+			"min_info": common.min_info_to_dict(self.min_info),
+			"l": self.l,
+			"likers_count": self.likers_count,
+			"i_like": self.i_like,
+			"likes_me": self.likes_me
+		}
+
 class UserList:
 	"""Provides a list of users which belong to the likers or favorites of
 	the client's account or another user.
@@ -64,19 +90,21 @@ class UserList:
 	count -- the total number of users
 	"""
 
+	__slots__ = ("count", "items", "next")
+
 	def __init__(self):
 		self.count = 0
 		self.items = []
 		self.next = 0
 
 	@staticmethod
-	def from_response(response: dict):
+	def from_response(response: dict, keep_min_info: bool = True, interner: common.MinInfoInterner = None):
 		"""Fills the attributes of this class from a server response."""
 
 		user_list = UserList()
 
 		for user in response["items"]:
-			user_info = UserInfo.from_response(user)
+			user_info = UserInfo.from_response(user, keep_min_info, interner)
 			user_list.items.append(user_info)
 
 		if "next" in response:
@@ -98,18 +126,20 @@ class UserVisitors:
 	next -- a Unix timestamp to show the older entries
 	"""
 
+	__slots__ = ("items", "next")
+
 	def __init__(self):
 		self.items = []
 		self.next = 0
 
 	@staticmethod
-	def from_response(response: dict):
+	def from_response(response: dict, keep_min_info: bool = True, interner: common.MinInfoInterner = None):
 		"""Fills the attributes of this class from a server response."""
 
 		user_list = UserVisitors()
 
 		for user in response["items"]:
-			user_info = UserInfo.from_response(user)
+			user_info = UserInfo.from_response(user, keep_min_info, interner)
 			user_list.items.append(user_info)
 
 		if "next" in response:
@@ -0,0 +1,112 @@
+# SPDX-FileCopyrightText: 2024 DaniElectra
+#
+# SPDX-License-Identifier: MIT
+
+from pou.online import sync, user
+
+import asyncio
+import unittest
+
+class FakeClient:
+	"""Serves a "visitors" list from memory, newest first, in pages of
+	page_size entries. Every visit is a minute after the previous one.
+	"""
+
+	def __init__(self, page_size: int = 20):
+		self.page_size = page_size
+		self.entries = []
+		self.time = 1000000
+		self.fail = False
+		self.requests = 0
+
+	def visit(self, *account_ids):
+		for account_id in account_ids:
+			self.entries = [entry for entry in self.entries if entry[0] != account_id]
+			self.time += 60
+			self.entries.insert(0, (account_id, self.time))
+
+	def remove(self, account_id: int):
+		self.entries = [entry for entry in self.entries if entry[0] != account_id]
+
+	async def visitors(self, account_id: int, since: int = 0):
+		self.requests += 1
+		if self.fail:
+			return None
+
+		entries = [entry for entry in self.entries if not since or entry[1] < since]
+		page = user.UserVisitors()
+		for other, visited in entries[:self.page_size]:
+			user_info = user.UserInfo()
+			user_info.account_id = other
+			page.items.append(user_info)
+
+		if len(entries) > self.page_size:
+			page.next = entries[self.page_size - 1][1]
+
+		return page
+
+class SynchronizerTest(unittest.TestCase):
+	def setUp(self):
+		self.client = FakeClient()
+		self.synchronizer = sync.Synchronizer(self.client)
+
+	def sync(self):
+		new_users = asyncio.run(self.synchronizer.sync(1, "visitors"))
+		if new_users is None:
+			return None
+
+		return [user_info.account_id for user_info in new_users]
+
+	def test_first_sync_returns_everything(self):
+		self.client.visit(1, 2, 3)
+		self.assertEqual(self.sync(), [3, 2, 1])
+		self.assertEqual(self.sync(), [])
+
+	def test_new_entries(self):
+		self.client.visit(*range(1, 101))
+		self.sync()
+
+		self.client.visit(101, 102)
+		self.client.requests = 0
+		self.assertEqual(self.sync(), [102, 101])
+		self.assertLessEqual(self.client.requests, 2)
+
+	def test_revisit_doesnt_hide_new_entries(self):
+		self.client.visit(1, 2, 3)
+		self.assertEqual(self.sync(), [3, 2, 1])
+
+		self.client.visit(4, 3)
+		self.assertEqual(self.sync(), [3, 4])
+		self.assertEqual(self.sync(), [])
+
+	def test_revisit_on_a_long_list(self):
+		self.client.visit(*range(1, 101))
+		self.sync()
+
+		self.client.visit(101, 100, 102, 95)
+		self.assertEqual(self.sync(), [95, 102, 100, 101])
+		self.assertEqual(self.sync(), [])
+
+	def test_removed_entries(self):
+		self.client.visit(*range(1, 101))
+		self.sync()
+
+		self.client.remove(100)
+		self.client.remove(90)
+		self.client.visit(101)
+		self.assertEqual(self.sync(), [101])
+
+	def test_failed_fetch_keeps_the_cursor(self):
+		self.client.visit(*range(1, 101))
+		self.sync()
+		cursor = self.synchronizer.cursors.get(1, "visitors")
+
+		self.client.fail = True
+		self.assertIsNone(self.sync())
+		self.assertEqual(self.synchronizer.cursors.get(1, "visitors"), cursor)
+
+		self.client.fail = False
+		self.assertEqual(self.sync(), [])
+
+if __name__ == "__main__":
+	unittest.main()